@@ -1,10 +1,11 @@
-import sqlite3
-import pyperclip
-import pyautogui
+import os
+import argparse
 import time
-import webbrowser
 import schedule
 from datetime import datetime
+import banco
+import backup
+import fila_whatsapp
 
 # --- CONFIGURAÇÕES ---
 ID_GRUPO_IGREJA = "7Fi40y3GnJG5AIoMSU03v6"
@@ -17,125 +18,138 @@ CONTATOS_LIDERANCA = {
     "COUTINHO": "5565981090775"
 }
 
+# Resumo: uma mensagem por responsável agrupando todas as tarefas alteradas (False = uma mensagem por tarefa)
+MODO_RESUMO = True
+
 # --- FUNÇÕES DE BUSCA (SQLITE) ---
+# Uma única conexão de longa duração basta para o processo do agendador
+banco.configurar(CAMINHO_BANCO, tamanho=1)
+banco.init_db()
+CONSUMIDOR_COMUNICADOS, CONSUMIDOR_TAREFAS = "agendador:comunicados", "agendador:tarefas"
+for consumidor in (CONSUMIDOR_COMUNICADOS, CONSUMIDOR_TAREFAS): banco.registrar_consumidor(consumidor)
+
+def _buscar_alterados(consumidor, tabela, colunas):
+    # Apenas os registros inseridos/alterados desde a última execução bem-sucedida (feed de alterações do banco.py).
+    # Lê direto do banco: são poucas linhas depois da marca e, em WAL, leitores não bloqueiam as escritas do app
+    alteracoes, nova_marca = banco.ler_alteracoes(consumidor, tabela)
+    info = {id_reg: (seq, bool(novo)) for id_reg, seq, novo, excluido in alteracoes if not excluido}
+    if not info: return [], nova_marca
+    marcadores = ",".join("?" * len(info))
+    linhas = banco.obter_pool().consultar(f"SELECT id, {colunas} FROM {tabela} WHERE id IN ({marcadores}) ORDER BY id", tuple(info))
+    return [(info[l[0]][0], info[l[0]][1]) + tuple(l) for l in linhas], nova_marca
 
-def buscar_ultimo_comunicado():
-    try:
-        conn = sqlite3.connect(CAMINHO_BANCO)
-        cursor = conn.cursor()
-        cursor.execute("SELECT titulo, mensagem, link FROM comunicados ORDER BY id DESC LIMIT 1")
-        resultado = cursor.fetchone()
-        conn.close()
-        return resultado
+def buscar_comunicados_novos():
+    try: return _buscar_alterados(CONSUMIDOR_COMUNICADOS, "comunicados", "titulo, mensagem, link")
     except Exception as e:
         print(f"❌ Erro banco comunicados: {e}")
-        return None
-
-def buscar_tarefas_pendentes():
-    try:
-        conn = sqlite3.connect(CAMINHO_BANCO)
-        cursor = conn.cursor()
-        # Busca apenas o que você marcou como 'Pendente' no seu App Streamlit
-        cursor.execute("SELECT tarefa, responsavel, prioridade FROM tarefas_bispado WHERE status = 'Pendente'")
-        resultados = cursor.fetchall()
-        conn.close()
-        return resultados
+        return [], None
+
+def buscar_tarefas_alteradas():
+    try: return _buscar_alterados(CONSUMIDOR_TAREFAS, "tarefas_bispado", "tarefa, responsavel, prioridade, status")
     except Exception as e:
         print(f"❌ Erro banco tarefas: {e}")
-        return []
+        return [], None
+
+# --- FUNÇÕES DE DISPARO (ENFILEIRAM NA FILA PERSISTENTE E DRENAM PELO TRANSPORTE) ---
+# Transporte usado pelo drenador; trocado pelo TransporteStub com --simular
+transporte = None
 
-# --- FUNÇÕES DE DISPARO (AUTOMAÇÃO DE INTERFACE) ---
+def obter_transporte():
+    global transporte
+    if transporte is None: transporte = fila_whatsapp.TransporteWhatsAppWeb()
+    return transporte
+
+def drenar_fila():
+    enviadas, falhas = fila_whatsapp.drenar(obter_transporte())
+    if enviadas or falhas: print(f"📬 Fila: {enviadas} enviada(s), {falhas} falha(s) | {fila_whatsapp.resumo_fila()}")
 
 def disparar_comunicado_grupo():
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] 🚀 Enviando comunicado ao grupo...")
-    comunicado = buscar_ultimo_comunicado()
-    if comunicado:
-        titulo, mensagem, link = comunicado
-        texto = f"⛪ *PORTAL DA ALA - COMUNICADO*\n\n📌 *{titulo.upper()}*\n\n{mensagem}\n"
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] 🚀 Enviando comunicados novos ao grupo...")
+    comunicados, nova_marca = buscar_comunicados_novos()
+    if nova_marca is None: return
+    for seq, novo, id_com, titulo, mensagem, link in comunicados:
+        cabecalho = "COMUNICADO" if novo else "COMUNICADO ATUALIZADO"
+        texto = f"⛪ *PORTAL DA ALA - {cabecalho}*\n\n📌 *{str(titulo).upper()}*\n\n{mensagem}\n"
         if link and str(link).lower() != "none": 
             texto += f"\n🔗 Saiba mais: {link}"
-        
-        pyperclip.copy(texto)
-        webbrowser.open(f"https://web.whatsapp.com/accept?code={ID_GRUPO_IGREJA}")
-        
-        time.sleep(50) # Tempo de carga para o grupo
-        
-        # Foco e envio usando a tecla ESC para centralizar na caixa de texto
-        pyautogui.click(10, 10) 
-        pyautogui.press('esc')
-        time.sleep(2)
-        pyautogui.hotkey('ctrl', 'v')
-        time.sleep(2)
-        pyautogui.press('enter')
-        print("✅ Grupo notificado!")
-    else:
-        print("⚠️ Sem comunicados recentes para o grupo.")
+        # Chaves determinísticas: se o processo cair antes de avançar a marca, o reenfileiramento não duplica
+        chave = f"comunicado:{id_com}:grupo" if novo else f"comunicado:{id_com}:{seq}"
+        fila_whatsapp.enfileirar(chave, "grupo", ID_GRUPO_IGREJA, texto, "Grupo da Ala")
+    banco.avancar_marca(CONSUMIDOR_COMUNICADOS, nova_marca)
+    if not comunicados: print("⚠️ Nenhum comunicado novo desde a última execução.")
+    drenar_fila()
+
+def _mensagem_tarefas(responsavel, pendentes, concluidas):
+    msg = f"Olá *{responsavel}*, há novidades nas suas tarefas no *Portal da Ala*:\n"
+    if pendentes: msg += "\n📋 *Novas/atualizadas (pendentes):*\n" + "\n".join(pendentes) + "\n"
+    if concluidas: msg += "\n✅ *Concluídas:*\n" + "\n".join(concluidas) + "\n"
+    return msg + "\n📌 _Por favor, verifique o painel do Bispado no App._"
 
 def disparar_tarefas_individuais():
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] 📋 Iniciando lembretes individuais...")
-    tarefas = buscar_tarefas_pendentes()
-    
-    if not tarefas:
-        print("✅ Nenhuma tarefa pendente encontrada no banco.")
-        return
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] 📋 Iniciando lembretes de tarefas novas/alteradas...")
+    tarefas, nova_marca = buscar_tarefas_alteradas()
+    if nova_marca is None: return
 
     # Agrupa tarefas por responsável
     dados_envio = {}
-    for tarefa, resp, prio in tarefas:
-        resp_upper = str(resp).upper().strip() 
-        if resp_upper not in dados_envio: 
-            dados_envio[resp_upper] = []
-        dados_envio[resp_upper].append(f"• *[{prio}]* {tarefa}")
-
-    for responsavel, lista_tarefas in dados_envio.items():
-        if responsavel in CONTATOS_LIDERANCA:
-            numero = CONTATOS_LIDERANCA[responsavel]
-            
-            msg = f"Olá *{responsavel}*, você tem as seguintes tarefas pendentes no *Portal da Ala*:\n\n"
-            msg += "\n".join(lista_tarefas)
-            msg += "\n\n📌 _Por favor, verifique o painel do Bispado no App._"
-            
-            pyperclip.copy(msg)
-            webbrowser.open(f"https://web.whatsapp.com/send?phone={numero}")
-            
-            print(f"⏳ Carregando conversa de {responsavel} (Aguarde 50s)...")
-            time.sleep(50) 
-            
-            # --- ESTRATÉGIA DE FOCO ROBUSTA ---
-            # 1. Clica no canto superior para focar na janela do navegador
-            pyautogui.click(10, 10) 
-            time.sleep(1)
-            
-            # 2. Usa ESC para forçar o foco na caixa de entrada de texto
-            pyautogui.press('esc')
-            time.sleep(2)
-            
-            print(f"⌨️ Colando mensagem para {responsavel}...")
-            pyautogui.hotkey('ctrl', 'v')
-            time.sleep(2)
-            pyautogui.press('enter')
-            
-            # 3. Espera o envio e fecha a aba
-            time.sleep(3)
-            pyautogui.hotkey('ctrl', 'w') 
-            print(f"✅ Notificação enviada para {responsavel}")
-            time.sleep(5) 
-        else:
+    for seq, novo, id_tarefa, tarefa, resp, prio, status in tarefas:
+        dados_envio.setdefault(str(resp).upper().strip(), []).append((id_tarefa, seq, status == "Pendente", f"• *[{prio}]* {tarefa}"))
+
+    for responsavel, itens in dados_envio.items():
+        if responsavel not in CONTATOS_LIDERANCA:
             print(f"⚠️ O responsável '{responsavel}' não cadastrado no dicionário.")
+            continue
+        numero = CONTATOS_LIDERANCA[responsavel]
+        if MODO_RESUMO:
+            # Uma única mensagem por responsável com tudo o que mudou
+            msg = _mensagem_tarefas(responsavel, [l for _, _, pend, l in itens if pend], [l for _, _, pend, l in itens if not pend])
+            fila_whatsapp.enfileirar(f"tarefas:{responsavel}:{max(seq for _, seq, _, _ in itens)}", "contato", numero, msg, responsavel)
+        else:
+            for id_tarefa, seq, pend, linha in itens:
+                msg = _mensagem_tarefas(responsavel, [linha] if pend else [], [] if pend else [linha])
+                fila_whatsapp.enfileirar(f"tarefa:{id_tarefa}:{seq}", "contato", numero, msg, responsavel)
+    banco.avancar_marca(CONSUMIDOR_TAREFAS, nova_marca)
+    if not tarefas: print("✅ Nenhuma tarefa nova ou alterada desde a última execução.")
+    drenar_fila()
+
+# --- BACKUP ---
+HORA_BACKUP = "03:00"
+
+def fazer_backup():
+    # O banco de cada ala cadastrada em alas.json (sem ele, o igreja.db), não só o que este agendador usa
+    for caminho in backup.bancos_das_alas(os.getcwd()):
+        if not os.path.exists(caminho): continue  # ala ainda não aberta no app: não há banco a copiar
+        try:
+            destino, paginas, segundos = backup.fazer_backup(caminho)
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 💾 Backup em {destino} ({paginas} páginas, {segundos:.1f}s)")
+        except Exception as e: print(f"❌ Erro no backup de {caminho}: {e}")
 
 # --- AGENDADOR E TESTE ---
 if __name__ == "__main__":
-    # PARA TESTAR AGORA: Descomente a linha abaixo e comente o bloco "while True"
-    # disparar_tarefas_individuais()
+    parser = argparse.ArgumentParser(description="Central de automação do WhatsApp da Ala")
+    parser.add_argument("--agora", action="store_true", help="dispara comunicado e tarefas uma vez e sai")
+    parser.add_argument("--simular", action="store_true", help="usa o transporte de simulação (não abre o navegador)")
+    args = parser.parse_args()
+    if args.simular: transporte = fila_whatsapp.TransporteStub()
+
+    recuperadas = fila_whatsapp.recuperar_interrompidas()
+    if recuperadas: print(f"♻️ {recuperadas} mensagem(ns) interrompida(s) voltaram para a fila.")
+
+    if args.agora:
+        disparar_comunicado_grupo()
+        disparar_tarefas_individuais()
+        raise SystemExit(0)
 
     print("⛪ Central de Automação da Ala Iniciada!")
-    print("📅 Configurado: Grupo às 13:00 | Liderança às 13:05")
+    print(f"📅 Configurado: Grupo às 14:10 | Liderança às 14:11 | Reenvio da fila a cada 5 min | Backup às {HORA_BACKUP}")
 
     # Agendamento das tarefas
     schedule.every().day.at("14:10").do(disparar_comunicado_grupo)
     schedule.every().day.at("14:11").do(disparar_tarefas_individuais)
+    schedule.every(5).minutes.do(drenar_fila)  # retentativas com backoff das mensagens que falharam
+    schedule.every().day.at(HORA_BACKUP).do(fazer_backup)  # online, com o app no ar (ver backup.py)
 
     # Loop principal de execução
     while True:
         schedule.run_pending()
-        time.sleep(30)
\ No newline at end of file
+        time.sleep(30)
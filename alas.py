@@ -0,0 +1,72 @@
+import os
+import re
+import json
+import threading
+import banco
+
+# --- VÁRIAS ALAS NO MESMO SERVIDOR ---
+# Cada ala tem o seu próprio arquivo SQLite (e a sua pasta de imagens), com pool de conexões e cache próprios:
+# escritas de uma ala nunca disputam o lock do banco de outra. A ala é escolhida no login (barra lateral)
+# e o app liga o pool dela na thread da sessão (banco.usar_pool).
+#
+# As alas são lidas de alas.json na pasta do app. Formato:
+#   {"alas": [{"id": "centro", "nome": "Ala Centro", "senha_lideranca": "...", "senha_bispado": "..."}, ...]}
+# "banco" e "posts" são opcionais (padrão: alas/<id>/igreja.db e alas/<id>/posts). Sem alas.json há uma
+# única ala, "principal", usando o igreja.db e a pasta posts/ de sempre.
+ARQUIVO_CONFIG = "alas.json"
+PASTA_ALAS = "alas"
+ALA_PADRAO = {"id": "principal", "nome": "Ala", "banco": "igreja.db", "posts": "posts"}
+
+
+class RegistroAlas:
+    """Configuração das alas e um pool de conexões (migrado na primeira utilização) por ala."""
+
+    def __init__(self, pasta_base, tamanho_pool=4):
+        self.pasta_base = pasta_base
+        self.tamanho_pool = tamanho_pool
+        self._pools = {}
+        self._lock = threading.Lock()
+        self.alas = self._carregar()
+
+    def _carregar(self):
+        caminho = os.path.join(self.pasta_base, ARQUIVO_CONFIG)
+        if not os.path.exists(caminho): return {ALA_PADRAO["id"]: dict(ALA_PADRAO)}
+        with open(caminho, encoding="utf-8") as f: lista = json.load(f)["alas"]
+        alas = {}
+        for ala in lista:
+            if not re.fullmatch(r"[A-Za-z0-9_-]+", str(ala.get("id", ""))): raise ValueError(f"id de ala inválido em {ARQUIVO_CONFIG}: {ala.get('id')!r}")
+            ala.setdefault("nome", ala["id"])
+            ala.setdefault("banco", os.path.join(PASTA_ALAS, ala["id"], "igreja.db"))
+            ala.setdefault("posts", os.path.join(PASTA_ALAS, ala["id"], "posts"))
+            alas[ala["id"]] = ala
+        return alas
+
+    def _caminho(self, relativo):
+        return relativo if os.path.isabs(relativo) else os.path.join(self.pasta_base, relativo)
+
+    def caminho_banco(self, id_ala):
+        return self._caminho(self.alas[id_ala]["banco"])
+
+    def pasta_posts(self, id_ala):
+        return self._caminho(self.alas[id_ala]["posts"])
+
+    def senha(self, id_ala, tipo, padrao):
+        return self.alas[id_ala].get(f"senha_{tipo}", padrao)
+
+    def pool(self, id_ala):
+        # Criado e migrado uma única vez por ala; chamadas concorrentes para a mesma ala esperam a primeira terminar
+        with self._lock:
+            pool = self._pools.get(id_ala)
+            if pool is not None: return pool
+            caminho = self.caminho_banco(id_ala)
+            os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+            os.makedirs(self.pasta_posts(id_ala), exist_ok=True)
+            pool = banco.PoolConexoes(caminho, tamanho=self.tamanho_pool)
+            banco.init_db(pool)
+            self._pools[id_ala] = pool
+            return pool
+
+    def fechar(self):
+        with self._lock:
+            for pool in self._pools.values(): pool.fechar()
+            self._pools.clear()
@@ -0,0 +1,130 @@
+import os
+import re
+import sys
+import time
+import sqlite3
+import argparse
+from contextlib import contextmanager
+from datetime import datetime
+
+# --- CÓPIAS DE SEGURANÇA E CÓPIAS INSTANTÂNEAS DO BANCO ---
+# Copiar o igreja.db com o app no ar (cp, download do arquivo) pode pegar uma escrita pela metade e perde o que ainda
+# está no WAL. copiar() usa a API de backup do SQLite, PAGINAS_POR_PASSO páginas por vez com uma pausa entre os passos,
+# dentro de uma transação de leitura aberta na origem: em WAL ela fixa o banco como estava no início, então a cópia é
+# consistente e as escritas do app seguem normalmente (vão para o WAL). Sem essa transação, cada escrita de outra
+# conexão faz a API recomeçar a cópia do zero e, com o app gravando, ela pode não terminar nunca.
+# O destino é gravado num .tmp, conferido (quick_check), passa para journal_mode=DELETE (um arquivo só, sem -wal/-shm)
+# e só então aparece com o nome final (os.replace).
+#
+#   fazer_backup(): cópia datada em backups/ ao lado do banco, mantendo as MANTER mais recentes. O agendador_whatsapp.py
+#                   faz a de todas as alas (bancos_das_alas) uma vez por dia; pela linha de comando (cron):
+#                   python backup.py [--banco igreja.db] [--todas-as-alas]
+#   instantaneo():  cópia temporária para leitores longos: o lote do gerar_relatorios.py lê dela com um pool somente
+#                   leitura (banco.PoolConexoes(somente_leitura=True)), e não do banco que o app está gravando.
+PASTA_BACKUPS = "backups"
+PAGINAS_POR_PASSO = 256     # ~1 MB com páginas de 4 KB
+PAUSA_ENTRE_PASSOS = 0.005  # segundos; deixa disco e CPU para o app entre os passos
+MANTER = 14
+
+def pasta_backups(caminho_banco):
+    return os.path.join(os.path.dirname(os.path.abspath(caminho_banco)), PASTA_BACKUPS)
+
+def _prefixo(caminho_banco):
+    return os.path.splitext(os.path.basename(caminho_banco))[0]
+
+def copiar(caminho_banco, destino, paginas=PAGINAS_POR_PASSO, pausa=PAUSA_ENTRE_PASSOS, substituir=True):
+    # Cópia online e consistente do banco em destino; devolve (páginas copiadas, segundos).
+    # substituir=False recusa (FileExistsError) um destino que já existe em vez de trocá-lo pela cópia nova
+    inicio = time.perf_counter()
+    tmp = f"{destino}.tmp{os.getpid()}"
+    if os.path.exists(tmp): os.remove(tmp)
+    total = [0]
+    def progresso(status, restantes, paginas_total):
+        total[0] = paginas_total
+        if restantes and pausa: time.sleep(pausa)
+    origem = sqlite3.connect(caminho_banco, timeout=30.0, isolation_level=None)
+    try:
+        origem.execute("BEGIN")
+        origem.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()  # abre a leitura: o estado copiado fica fixo daqui em diante
+        copia = sqlite3.connect(tmp, isolation_level=None)
+        try:
+            origem.backup(copia, pages=paginas, progress=progresso)
+            copia.execute("PRAGMA journal_mode=DELETE")
+            resultado = copia.execute("PRAGMA quick_check").fetchone()[0]
+            if resultado != "ok": raise sqlite3.DatabaseError(f"Cópia de {caminho_banco} falhou na verificação: {resultado}")
+        finally: copia.close()
+    except BaseException:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
+    finally: origem.close()
+    if not substituir and os.path.exists(destino):
+        os.remove(tmp)
+        raise FileExistsError(f"Backup já existe: {destino}")
+    os.replace(tmp, destino)
+    return total[0], time.perf_counter() - inicio
+
+# --- BACKUPS COM ROTAÇÃO ---
+def listar_backups(caminho_banco, pasta=None):
+    # [(caminho, bytes, data)] do mais recente para o mais antigo
+    pasta = pasta or pasta_backups(caminho_banco)
+    if not os.path.isdir(pasta): return []
+    # Nomes com microssegundos (backups antigos, só até o segundo, também são listados e rotacionados)
+    padrao = re.compile(re.escape(_prefixo(caminho_banco)) + r"-(\d{8}-\d{6})(?:-(\d{6}))?\.db")
+    backups = []
+    for nome in os.listdir(pasta):
+        m = padrao.fullmatch(nome)
+        if m: backups.append((os.path.join(pasta, nome), os.path.getsize(os.path.join(pasta, nome)),
+                              datetime.strptime(f"{m.group(1)}-{m.group(2) or '000000'}", "%Y%m%d-%H%M%S-%f")))
+    return sorted(backups, key=lambda b: b[2], reverse=True)
+
+def rotacionar(caminho_banco, pasta=None, manter=MANTER):
+    # Apaga os backups além dos `manter` mais recentes; devolve os caminhos apagados
+    apagados = [caminho for caminho, _, _ in listar_backups(caminho_banco, pasta)[manter:]]
+    for caminho in apagados: os.remove(caminho)
+    return apagados
+
+def fazer_backup(caminho_banco, pasta=None, manter=MANTER):
+    # Devolve (caminho do backup, páginas, segundos)
+    pasta = pasta or pasta_backups(caminho_banco)
+    os.makedirs(pasta, exist_ok=True)
+    # Dois backups no mesmo segundo (manual + agendado, --todas-as-alas repetido) não podem se sobrescrever
+    destino = os.path.join(pasta, f"{_prefixo(caminho_banco)}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.db")
+    paginas, segundos = copiar(caminho_banco, destino, substituir=False)
+    rotacionar(caminho_banco, pasta, manter)
+    return destino, paginas, segundos
+
+# --- LEITURA A PARTIR DE UMA CÓPIA ---
+@contextmanager
+def instantaneo(caminho_banco):
+    # Caminho de uma cópia do banco tirada agora, só de quem a pediu (nome único), apagada na saída
+    pasta = pasta_backups(caminho_banco)
+    os.makedirs(pasta, exist_ok=True)
+    destino = os.path.join(pasta, f"{_prefixo(caminho_banco)}-instantaneo-{os.getpid()}-{time.time_ns()}.db")
+    copiar(caminho_banco, destino)
+    try: yield destino
+    finally:
+        try: os.remove(destino)
+        except OSError: pass
+
+# --- TODAS AS ALAS ---
+def bancos_das_alas(pasta_base):
+    # Caminhos dos bancos de cada ala de alas.json (sem ele, só o igreja.db da pasta)
+    import alas  # tardio: só quem faz backup de todas as alas precisa do registro
+    registro = alas.RegistroAlas(pasta_base)
+    return [registro.caminho_banco(id_ala) for id_ala in registro.alas]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backup online do banco da Ala (API de backup do SQLite), com rotação")
+    parser.add_argument("--banco", default="igreja.db", help="caminho do igreja.db")
+    parser.add_argument("--todas-as-alas", action="store_true", help="faz o backup do banco de cada ala de alas.json")
+    parser.add_argument("--manter", type=int, default=MANTER, help="quantos backups manter por banco")
+    args = parser.parse_args()
+
+    bancos = bancos_das_alas(os.getcwd()) if args.todas_as_alas else [args.banco]
+    falhou = False
+    for caminho in bancos:
+        if not os.path.exists(caminho): print(f"❌ Banco não encontrado: {caminho}"); falhou = True; continue
+        try: destino, paginas, segundos = fazer_backup(caminho, manter=args.manter)
+        except (sqlite3.Error, OSError) as e: print(f"❌ {caminho}: {e}"); falhou = True; continue
+        print(f"💾 {destino} ({paginas} páginas, {os.path.getsize(destino) / 1024:.0f} KB, {segundos:.2f}s)")
+    if falhou: sys.exit(1)
@@ -0,0 +1,487 @@
+import sqlite3
+import threading
+import queue
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import migracoes
+import imagens
+import instrumentacao
+from instrumentacao import medido
+
+# --- CONFIGURAÇÃO DAS CONEXÕES ---
+# Pragmas aplicados uma única vez por conexão (as conexões vivem enquanto o processo viver)
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",      # leitores não bloqueiam o escritor
+    "PRAGMA synchronous=NORMAL",    # seguro em WAL e bem mais rápido que FULL
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",      # ~8 MB de cache de páginas por conexão
+    "PRAGMA foreign_keys=ON",
+)
+# Cópias instantâneas (backup.py) são arquivos que não mudam depois de gravados: abertos como imutáveis, sem locks nem WAL
+PRAGMAS_SOMENTE_LEITURA = (
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+)
+# Tamanho do cache de statements preparados do módulo sqlite3 (reutilizados entre reruns)
+CACHE_STATEMENTS = 256
+# Resultados guardados por pool no CacheConsultas (frames, PDFs, figuras); acima disso saem os menos usados
+MAXIMO_ENTRADAS_CACHE = 256
+
+
+class CacheConsultas:
+    """Cache LRU de resultados de leitura invalidado por contadores de versão por tabela."""
+
+    def __init__(self, maximo=MAXIMO_ENTRADAS_CACHE):
+        self._lock = threading.Lock()
+        self._versoes = {}
+        self._entradas = OrderedDict()  # chave -> (versões, valor, tabelas), da menos para a mais usada
+        self.maximo = maximo
+        self.acertos = 0
+        self.falhas = 0
+        self.invalidacoes = 0
+
+    def versao(self, tabelas):
+        with self._lock: return tuple(self._versoes.get(t, 0) for t in tabelas)
+
+    def obter(self, chave, tabelas, carregar):
+        # As versões são lidas ANTES da consulta: uma escrita concorrente torna a entrada obsoleta na próxima leitura
+        tabelas = tuple(tabelas)
+        versoes = self.versao(tabelas)
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and entrada[0] == versoes:
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+                return entrada[1]
+            self.falhas += 1
+        valor = carregar()
+        with self._lock:
+            self._entradas[chave] = (versoes, valor, tabelas)
+            self._entradas.move_to_end(chave)
+            # Chaves vêm de buscas livres, cursores e datas: as menos usadas saem para a memória não crescer sem limite
+            while len(self._entradas) > self.maximo: self._entradas.popitem(last=False)
+        return valor
+
+    def invalidar(self, *tabelas):
+        with self._lock:
+            for t in tabelas: self._versoes[t] = self._versoes.get(t, 0) + 1
+            # Entradas que dependem das tabelas alteradas nunca mais seriam servidas: saem já
+            alteradas = set(tabelas)
+            for chave in [c for c, e in self._entradas.items() if alteradas.intersection(e[2])]: del self._entradas[chave]
+            self.invalidacoes += 1
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+            for t in self._versoes: self._versoes[t] += 1
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {"acertos": self.acertos, "falhas": self.falhas, "invalidacoes": self.invalidacoes,
+                    "taxa_acerto": (self.acertos / total) if total else 0.0, "entradas": len(self._entradas),
+                    "versoes": dict(self._versoes)}
+
+
+class PoolConexoes:
+    """Pool thread-safe de conexões SQLite de longa duração."""
+
+    def __init__(self, caminho, tamanho=4, timeout=30.0, somente_leitura=False):
+        self.caminho = caminho
+        self.tamanho = tamanho
+        self.timeout = timeout
+        self.somente_leitura = somente_leitura
+        self._livres = queue.LifoQueue()
+        self._criadas = 0
+        self._lock = threading.Lock()
+        self.cache = CacheConsultas()
+        self.geracoes_externas = {}  # última geração vista de alteracoes_externas, por tabela
+
+    def _nova_conexao(self):
+        if self.somente_leitura:
+            conn = sqlite3.connect(Path(self.caminho).resolve().as_uri() + "?mode=ro&immutable=1", uri=True, timeout=self.timeout,
+                                   isolation_level=None, check_same_thread=False, cached_statements=CACHE_STATEMENTS)
+            for pragma in PRAGMAS_SOMENTE_LEITURA: conn.execute(pragma)
+            return conn
+        conn = sqlite3.connect(self.caminho, timeout=self.timeout, isolation_level=None,
+                               check_same_thread=False, cached_statements=CACHE_STATEMENTS)
+        for pragma in PRAGMAS: conn.execute(pragma)
+        return conn
+
+    def _adquirir(self):
+        try: return self._livres.get_nowait()
+        except queue.Empty: pass
+        with self._lock:
+            criar = self._criadas < self.tamanho
+            if criar: self._criadas += 1
+        if criar:
+            try: return self._nova_conexao()
+            except Exception:
+                with self._lock: self._criadas -= 1
+                raise
+        try: return self._livres.get(timeout=self.timeout)
+        except queue.Empty: raise TimeoutError(f"Nenhuma conexão livre em {self.timeout}s ({self.caminho})")
+
+    def _devolver(self, conn):
+        if conn.in_transaction: conn.execute("ROLLBACK")
+        self._livres.put(conn)
+
+    @contextmanager
+    def conexao(self):
+        conn = self._adquirir()
+        try: yield conn
+        finally: self._devolver(conn)
+
+    @contextmanager
+    def transacao(self):
+        # BEGIN IMMEDIATE reserva a escrita logo no início, evitando deadlock de upgrade de lock
+        with self.conexao() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try: yield conn
+            except BaseException:
+                conn.execute("ROLLBACK"); raise
+            conn.execute("COMMIT")
+
+    def executar(self, sql, params=()):
+        with self.transacao() as conn: return conn.execute(sql, params).lastrowid
+
+    def executar_muitos(self, sql, lista_params):
+        with self.transacao() as conn: conn.executemany(sql, lista_params)
+
+    def consultar(self, sql, params=()):
+        with self.conexao() as conn: linhas = conn.execute(sql, params).fetchall()
+        instrumentacao.contar_consulta(len(linhas))
+        return linhas
+
+    def consultar_df(self, sql, params=()):
+        with self.conexao() as conn: df = pd.read_sql_query(sql, conn, params=params)
+        instrumentacao.contar_consulta(len(df))
+        return df
+
+    def fechar(self):
+        while True:
+            try: conn = self._livres.get_nowait()
+            except queue.Empty: break
+            conn.close()
+            with self._lock: self._criadas -= 1
+
+
+# --- POOL ATIVO ---
+# Scripts e o agendador usam um único pool do processo (definir_pool/configurar). O app, que atende várias alas,
+# liga em cada thread o pool da ala da sessão (usar_pool); essa escolha tem precedência sobre o pool do processo.
+_pool = None
+_local = threading.local()
+
+def definir_pool(pool):
+    global _pool
+    _pool = pool
+    return pool
+
+def configurar(caminho, **kwargs):
+    return definir_pool(PoolConexoes(caminho, **kwargs))
+
+def usar_pool(pool):
+    _local.pool = pool
+    return pool
+
+@contextmanager
+def com_pool(pool):
+    # Para código que roda fora da thread do rerun (ex.: downloads gerados sob demanda pelo Streamlit)
+    anterior = getattr(_local, "pool", None)
+    _local.pool = pool
+    try: yield pool
+    finally: _local.pool = anterior
+
+def obter_pool():
+    pool = getattr(_local, "pool", None) or _pool
+    if pool is None: raise RuntimeError("Banco não configurado: chame banco.configurar(caminho) antes de usar.")
+    return pool
+
+# --- CACHE DE LEITURA ---
+def versao_dados(*tabelas):
+    return obter_pool().cache.versao(tabelas)
+
+def estatisticas_cache():
+    return obter_pool().cache.estatisticas()
+
+def _gravar(tabela, sql, params=()):
+    pool = obter_pool()
+    id_novo = pool.executar(sql, params)
+    pool.cache.invalidar(tabela)
+    return id_novo
+
+# --- ESCRITAS DE OUTROS PROCESSOS ---
+# O cache de leitura vive na memória de cada processo: quem grava em lote (importacao.py, também pela linha de comando)
+# marca as tabelas em alteracoes_externas na mesma transação, e o app confere essa tabela no início de cada rerun.
+def marcar_alteracao_externa(conn, *tabelas):
+    conn.executemany("INSERT INTO alteracoes_externas (tabela, geracao) VALUES (?, 1) ON CONFLICT(tabela) DO UPDATE SET geracao = geracao + 1",
+                     [(t,) for t in tabelas])
+
+def sincronizar_cache(pool=None):
+    # Invalida as tabelas cuja geração mudou desde a última conferência deste pool; devolve as tabelas invalidadas
+    pool = pool or obter_pool()
+    try: atuais = dict(pool.consultar("SELECT tabela, geracao FROM alteracoes_externas"))
+    except sqlite3.OperationalError: return []  # banco ainda sem a migração 10
+    mudaram = [t for t, g in atuais.items() if pool.geracoes_externas.get(t) != g]
+    if mudaram:
+        pool.cache.invalidar(*mudaram)
+        pool.geracoes_externas.update(atuais)
+    return mudaram
+
+# --- FEED DE ALTERAÇÕES (log_alteracoes, mantido por triggers) ---
+def registrar_consumidor(consumidor):
+    # O log só é podado até a menor marca entre os consumidores registrados: registre todos antes do primeiro avanço
+    obter_pool().executar("INSERT OR IGNORE INTO marcas_consumidor (consumidor, ultima_seq, atualizado_em) VALUES (?, 0, ?)",
+                          (consumidor, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+
+def ler_alteracoes(consumidor, tabela):
+    # Registros alterados desde a marca do consumidor: [(id_registro, ultima_seq, novo, excluido)] e a nova marca.
+    # A nova marca é o topo do log inteiro (lido antes), para que consumidores parados não segurem a poda do log.
+    pool = obter_pool()
+    topo = pool.consultar("SELECT COALESCE(MAX(seq), 0) FROM log_alteracoes")[0][0]
+    marca = pool.consultar("SELECT ultima_seq FROM marcas_consumidor WHERE consumidor = ?", (consumidor,))
+    marca = marca[0][0] if marca else 0
+    linhas = pool.consultar("SELECT id_registro, MAX(seq), MAX(operacao = 'I'), MAX(operacao = 'D') FROM log_alteracoes "
+                            "WHERE tabela = ? AND seq > ? AND seq <= ? GROUP BY id_registro ORDER BY MAX(seq)", (tabela, marca, topo))
+    return linhas, max(topo, marca)
+
+def avancar_marca(consumidor, seq):
+    # Chamar só depois que as alterações lidas foram tratadas com sucesso; poda o log já consumido por todos
+    with obter_pool().transacao() as c:
+        c.execute("INSERT INTO marcas_consumidor (consumidor, ultima_seq, atualizado_em) VALUES (?, ?, ?) "
+                  "ON CONFLICT(consumidor) DO UPDATE SET ultima_seq = MAX(ultima_seq, excluded.ultima_seq), atualizado_em = excluded.atualizado_em",
+                  (consumidor, seq, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        c.execute("DELETE FROM log_alteracoes WHERE seq <= (SELECT MIN(ultima_seq) FROM marcas_consumidor)")
+
+# --- ESQUEMA ---
+def init_db(pool=None):
+    # Aplica apenas as migrações pendentes (ver migracoes.py); chamado uma vez por processo
+    pool = pool or obter_pool()
+    aplicadas = migracoes.migrar(pool)
+    pool.cache.limpar()
+    return aplicadas
+
+# --- FUNÇÕES GERAIS ---
+def adicionar_comunicado(t, m, a, l, img):
+    _gravar('comunicados', 'INSERT INTO comunicados (data_postagem, titulo, mensagem, autor, link, imagem) VALUES (?,?,?,?,?,?)', (datetime.now().strftime("%Y-%m-%d"), t, m, a, l, img))
+
+def adicionar_planejamento_lideranca(org, atv, data_p, h_ini, h_fim):
+    # Grava mesmo com conflito de horário; devolve as atividades do dia que cruzam com a nova (ver conflitos.py)
+    import conflitos  # tardio: conflitos -> recorrencias -> banco
+    choques = conflitos.sobrepostas(data_p, h_ini, h_fim)
+    _gravar('planejamento_lideranca', 'INSERT INTO planejamento_lideranca (organizacao, atividade, data_planejada, horario_inicio, horario_fim) VALUES (?,?,?,?,?)', (org, atv, data_p, h_ini, h_fim))
+    return choques
+
+def adicionar_tarefa_bispado(tarefa, prioridade, responsavel, status):
+    _gravar('tarefas_bispado', 'INSERT INTO tarefas_bispado (data_criacao, tarefa, status, prioridade, responsavel) VALUES (?, ?, ?, ?, ?)', (datetime.now().strftime("%Y-%m-%d"), tarefa, status, prioridade, responsavel))
+
+def atualizar_status_tarefa(id_item, novo_status):
+    _gravar('tarefas_bispado', 'UPDATE tarefas_bispado SET status = ? WHERE id = ?', (novo_status, id_item))
+
+def adicionar_agenda_bispado(data, horario, nome, status):
+    if hasattr(data, "isoformat"): data = data.isoformat()
+    _gravar('agenda_bispado', 'INSERT INTO agenda_bispado (data_agenda, horario, nome_compromisso, status) VALUES (?, ?, ?, ?)', (data, horario, nome, status))
+
+def atualizar_indicador(id_item, novo_atual, nova_meta):
+    _gravar('indicadores', 'UPDATE indicadores SET atual = ?, meta = ? WHERE id = ?', (novo_atual, nova_meta, id_item))
+
+def excluir_registro(tabela, id_item, imagem_path=None):
+    _gravar(tabela, f'DELETE FROM {tabela} WHERE id = ?', (id_item,))
+    # Imagens são endereçadas pelo conteúdo: o mesmo arquivo pode estar em outro comunicado
+    if imagem_path and not obter_pool().consultar("SELECT 1 FROM comunicados WHERE imagem = ? LIMIT 1", (str(imagem_path),)):
+        imagens.remover_imagem(imagem_path)
+
+@medido()
+def ler_dados(tabela, ordem="id DESC"):
+    # Frames em cache são compartilhados entre sessões: devolve uma cópia rasa para proteger a entrada
+    pool = obter_pool()
+    try: df = pool.cache.obter(("ler_dados", tabela, ordem), (tabela,), lambda: pool.consultar_df(f"SELECT * FROM {tabela} ORDER BY {ordem}"))
+    except: return pd.DataFrame()
+    return df.copy(deep=False)
+
+@medido()
+def ler_pagina(tabela, coluna="id", desc=True, apos=None, limite=20):
+    # Paginação por chave (keyset): continua depois do cursor (valor da coluna, id) em vez de OFFSET,
+    # então o custo de cada página não cresce com o histórico. Devolve (df, cursor da próxima página ou None).
+    # Linhas com a coluna NULL (ex.: agenda sem data) vêm por último nos dois sentidos; comparar (NULL, id) com o cursor
+    # é sempre falso, então elas têm filtro próprio, senão a paginação pararia calada no primeiro cursor NULL.
+    pool = obter_pool()
+    op, sentido = ("<", "DESC") if desc else (">", "ASC")
+    if coluna == "id": ordem, filtro, params = f"id {sentido}", f"id {op} ?", (apos[1],) if apos else ()
+    else:
+        ordem = f"{coluna} IS NULL, {coluna} {sentido}, id {sentido}"
+        if apos and apos[0] is None: filtro, params = f"{coluna} IS NULL AND id {op} ?", (apos[1],)
+        else: filtro, params = f"({coluna} IS NULL OR ({coluna}, id) {op} (?, ?))", tuple(apos or ())
+    sql = f"SELECT * FROM {tabela} {'WHERE ' + filtro if apos else ''} ORDER BY {ordem} LIMIT ?"
+    try: df = pool.cache.obter(("pagina", tabela, coluna, desc, apos, limite), (tabela,), lambda: pool.consultar_df(sql, params + (limite + 1,)))
+    except: return pd.DataFrame(), None
+    if len(df) <= limite: return df.copy(deep=False), None
+    df = df.iloc[:limite]
+    valor = df[coluna].iloc[-1]
+    valor = None if pd.isna(valor) else valor.item() if hasattr(valor, "item") else valor
+    return df.copy(deep=False), (valor, int(df['id'].iloc[-1]))
+
+# --- BUSCA TEXTUAL (índice FTS5 "busca", mantido por triggers: ver migracoes.py) ---
+TABELAS_BUSCA = ("comunicados", "tarefas_bispado", "agenda_bispado", "planejamento_lideranca")
+
+def _consulta_fts(texto):
+    # Cada palavra vira um prefixo entre aspas ("reun"* acha "reunião"): o texto digitado nunca é interpretado como sintaxe FTS5
+    termos = [t.replace('"', '') for t in str(texto).split()]
+    return " ".join(f'"{t}"*' for t in termos if t)
+
+@medido()
+def buscar(texto, tabelas=TABELAS_BUSCA, pagina=0, por_pagina=20):
+    # Resultados ordenados por relevância (bm25, título pesa mais que o corpo). Devolve (df, há mais páginas)
+    consulta = _consulta_fts(texto)
+    tabelas = tuple(tabelas)
+    if not consulta or not tabelas: return pd.DataFrame(columns=["tabela", "id_registro", "titulo", "trecho", "data"]), False
+    pool = obter_pool()
+    sql = f"""SELECT tabela, id_registro, titulo, snippet(busca, -1, '**', '**', '…', 12) AS trecho, data
+              FROM busca WHERE busca MATCH ? AND tabela IN ({','.join('?' * len(tabelas))})
+              ORDER BY bm25(busca, 0, 0, 10.0, 1.0) LIMIT ? OFFSET ?"""
+    try: df = pool.cache.obter(("busca", consulta, tabelas, pagina, por_pagina), TABELAS_BUSCA,
+                               lambda: pool.consultar_df(sql, (consulta,) + tabelas + (por_pagina + 1, pagina * por_pagina)))
+    except Exception: return pd.DataFrame(columns=["tabela", "id_registro", "titulo", "trecho", "data"]), False
+    return df.iloc[:por_pagina].copy(deep=False), len(df) > por_pagina
+
+# --- CARAVANA ---
+MESES_CARAVANA = ["Janeiro", "Abril", "Julho", "Outubro"]
+
+def adicionar_caravana_simples(nome, mes, total, pago):
+    quitado = 1 if pago >= total else 0
+    _gravar('financeiro_caravanas', 'INSERT INTO financeiro_caravanas (nome_irmao, mes_caravana, valor_pago, valor_total, quitado) VALUES (?, ?, ?, ?, ?)', (nome, mes, pago, total, quitado))
+
+COLUNAS_EDITOR_CARAVANA = ['nome_irmao', 'valor_total', 'valor_pago', 'quitado']
+
+def diff_caravana(df_base, df_editado, colunas=COLUNAS_EDITOR_CARAVANA):
+    # Compara pelo id, não pelos rótulos do índice: o st.data_editor reaproveita rótulos da RangeIndex, e apagar a última
+    # linha e criar outra na mesma edição viraria um UPDATE do id apagado. Linhas sem id são novas, ids da base ausentes do
+    # editor foram removidos e as demais são comparadas célula a célula. O editor nunca recebe o id das linhas que criou:
+    # atualizar_lote_caravana guarda em df_base.attrs["ids_novos"] {rótulo no editor: id gravado} para reconhecê-las.
+    # Devolve alterados (rótulos da base), inseridos (rótulos do editor) e removidos (ids, rótulos da base).
+    ids_novos = df_base.attrs.get("ids_novos", {})
+    ids = pd.to_numeric(df_editado['id'], errors='coerce')
+    sem_id = ids.isna()
+    if sem_id.any(): ids[sem_id] = [ids_novos.get(r, np.nan) for r in ids.index[sem_id]]
+    inseridos = df_editado[ids.isna()]
+    editados = df_editado[ids.notna()].set_index(ids[ids.notna()].astype(int))
+    ids_base = df_base['id'].astype(int)
+    presentes = ids_base.isin(editados.index)
+    removidos = df_base.loc[~presentes, 'id']
+    comuns = df_base[presentes]
+    antes, depois = comuns[colunas], editados.loc[ids_base[presentes], colunas].set_axis(comuns.index)
+    mudou = np.zeros(len(comuns), dtype=bool)
+    for col in colunas:
+        a, b = antes[col], depois[col]
+        if pd.api.types.is_numeric_dtype(a) and pd.api.types.is_numeric_dtype(b):
+            mudou |= ~np.isclose(a.to_numpy(dtype=float), b.to_numpy(dtype=float), atol=0.001, equal_nan=True)
+        else:
+            mudou |= ((a != b) & ~(a.isna() & b.isna())).to_numpy()
+    alterados = depois[mudou].assign(id=comuns.loc[mudou, 'id'])
+    return alterados, inseridos, removidos
+
+@medido()
+def atualizar_lote_caravana(df_editado, df_base, mes):
+    # Grava apenas a diferença entre o que já está no banco (df_base) e o editor, numa única transação.
+    # Devolve o novo estado persistido (com os ids das linhas inseridas, lembrados em attrs["ids_novos"]) e o total de alterações.
+    alterados, inseridos, removidos = diff_caravana(df_base, df_editado)
+    inseridos = inseridos[inseridos['nome_irmao'].fillna('').astype(str).str.strip() != '']  # linha nova ainda sem nome: espera
+    if alterados.empty and inseridos.empty and removidos.empty: return df_base, 0
+
+    persistido = df_base.drop(index=removidos.index)
+    novos_ids = {}
+    with obter_pool().transacao() as c:
+        if not alterados.empty:
+            c.executemany('UPDATE financeiro_caravanas SET nome_irmao = ?, valor_pago = ?, valor_total = ?, quitado = ? WHERE id = ?',
+                          zip(alterados['nome_irmao'], alterados['valor_pago'].astype(float), alterados['valor_total'].astype(float),
+                              alterados['quitado'].fillna(False).astype(bool).astype(int), alterados['id'].astype(int)))
+        for rotulo, row in zip(inseridos.index, inseridos.itertuples(index=False)):
+            total = float(row.valor_total or 0.0) if pd.notna(row.valor_total) else 0.0
+            pago = float(row.valor_pago or 0.0) if pd.notna(row.valor_pago) else 0.0
+            quitado = 1 if (bool(row.quitado) if pd.notna(row.quitado) else pago >= total) else 0
+            novos_ids[rotulo] = c.execute('INSERT INTO financeiro_caravanas (nome_irmao, mes_caravana, valor_pago, valor_total, quitado) VALUES (?, ?, ?, ?, ?)',
+                                          (str(row.nome_irmao).strip(), mes, pago, total, quitado)).lastrowid
+        if not removidos.empty:
+            c.executemany('DELETE FROM financeiro_caravanas WHERE id = ?', ((int(i),) for i in removidos))
+    obter_pool().cache.invalidar('financeiro_caravanas')
+
+    if not alterados.empty: persistido.loc[alterados.index, COLUNAS_EDITOR_CARAVANA] = alterados[COLUNAS_EDITOR_CARAVANA]
+    if novos_ids:
+        novos = df_editado.loc[list(novos_ids)].copy()
+        novos['id'] = pd.Series(novos_ids)
+        persistido = pd.concat([persistido, novos])
+    apagados = set(removidos.astype(int))
+    persistido.attrs["ids_novos"] = {r: i for r, i in df_base.attrs.get("ids_novos", {}).items() if i not in apagados} | novos_ids
+    return persistido, len(alterados) + len(novos_ids) + len(removidos)
+
+@medido()
+def ler_caravana_mes(mes):
+    # Apenas as linhas do mês selecionado (busca por idx_caravanas_mes)
+    pool = obter_pool()
+    df = pool.cache.obter(("caravana_mes", mes), ("financeiro_caravanas",), lambda: pool.consultar_df(
+        "SELECT id, nome_irmao, mes_caravana, valor_pago, valor_total, quitado FROM financeiro_caravanas WHERE mes_caravana = ? ORDER BY id DESC", (mes,)))
+    return df.copy(deep=False)
+
+@medido()
+def get_totais_caravana(mes):
+    pool = obter_pool()
+    return pool.cache.obter(("caravana_totais", mes), ("financeiro_caravanas",), lambda: pool.consultar(
+        "SELECT COALESCE(SUM(valor_total), 0), COALESCE(SUM(valor_pago), 0) FROM financeiro_caravanas WHERE mes_caravana = ?", (mes,))[0])
+
+# --- ORÇAMENTO ---
+def adicionar_despesa(categoria, descricao, valor, data, responsavel):
+    _gravar('despesas', 'INSERT INTO despesas (categoria, descricao, valor, data_despesa, responsavel) VALUES (?, ?, ?, ?, ?)', (categoria, descricao, valor, data, responsavel))
+
+# Os totais vêm do razão materializado (razao_categoria / razao_mensal, mantidos por triggers: ver migracoes.py),
+# então as leituras custam O(categorias) ou O(categorias x meses do período), nunca um scan de despesas.
+def intervalo_periodo(tipo, ano, numero=1):
+    # (mês inicial, mês final) em AAAA-MM: tipo "mes" (numero = mês), "trimestre" (numero = 1..4) ou "ano"
+    if tipo == "mes": return f"{ano}-{numero:02d}", f"{ano}-{numero:02d}"
+    if tipo == "trimestre": return f"{ano}-{3 * numero - 2:02d}", f"{ano}-{3 * numero:02d}"
+    return f"{ano}-01", f"{ano}-12"
+
+@medido()
+def get_resumo_orcamento(inicio=None, fim=None):
+    # Sem período: saldos de todo o histórico. Com período (meses AAAA-MM): "Gasto" é o do período e o "Saldo" é o saldo corrente ao fim dele
+    df_resumo, total_orcado, total_gasto = obter_pool().cache.obter(("resumo_orcamento", inicio, fim), ("orcamentos_iniciais", "despesas"),
+                                                                    lambda: _calcular_resumo_orcamento(inicio, fim))
+    return df_resumo.copy(deep=False), total_orcado, total_gasto
+
+def _calcular_resumo_orcamento(inicio=None, fim=None):
+    pool = obter_pool()
+    if inicio is None:
+        df = pool.consultar_df("""SELECT o.categoria AS "Categoria", o.valor_inicial AS "Orçamento", COALESCE(r.gasto, 0.0) AS "Gasto", COALESCE(r.gasto, 0.0) AS acumulado
+                                  FROM orcamentos_iniciais o LEFT JOIN razao_categoria r ON r.categoria = o.categoria ORDER BY o.id""")
+        total_gasto = pool.consultar("SELECT COALESCE(SUM(gasto), 0) FROM razao_categoria")[0][0]
+    else:
+        df = pool.consultar_df("""SELECT o.categoria AS "Categoria", o.valor_inicial AS "Orçamento", COALESCE(r.gasto, 0.0) AS "Gasto", COALESCE(r.acumulado, 0.0) AS acumulado
+                                  FROM orcamentos_iniciais o
+                                  LEFT JOIN (SELECT categoria, SUM(CASE WHEN mes >= ? THEN gasto ELSE 0 END) AS gasto, SUM(gasto) AS acumulado
+                                             FROM razao_mensal WHERE mes <= ? GROUP BY categoria) r ON r.categoria = o.categoria
+                                  ORDER BY o.id""", (inicio, fim))
+        total_gasto = pool.consultar("SELECT COALESCE(SUM(gasto), 0) FROM razao_mensal WHERE mes BETWEEN ? AND ?", (inicio, fim))[0][0]
+    total_orcado = df['Orçamento'].sum() if not df.empty else 0
+    df['Saldo'] = df['Orçamento'] - df['acumulado']
+    df['% Uso'] = (df['acumulado'] / df['Orçamento'].where(df['Orçamento'] > 0) * 100).fillna(0.0)
+    return df.drop(columns='acumulado'), total_orcado, total_gasto
+
+@medido()
+def evolucao_mensal(ano):
+    # Gasto de cada mês do ano e saldo corrente (orçamento total - tudo gasto até o fim do mês), a partir do razão mensal
+    return obter_pool().cache.obter(("evolucao_mensal", ano), ("orcamentos_iniciais", "despesas"), lambda: _calcular_evolucao(ano)).copy(deep=False)
+
+def _calcular_evolucao(ano):
+    pool = obter_pool()
+    anterior = pool.consultar("SELECT COALESCE(SUM(gasto), 0) FROM razao_mensal WHERE mes < ?", (f"{ano}-01",))[0][0]
+    orcado = pool.consultar("SELECT COALESCE(SUM(valor_inicial), 0) FROM orcamentos_iniciais")[0][0]
+    df = pool.consultar_df("SELECT mes AS \"Mês\", SUM(gasto) AS \"Gasto\" FROM razao_mensal WHERE mes BETWEEN ? AND ? GROUP BY mes", (f"{ano}-01", f"{ano}-12"))
+    meses = pd.DataFrame({"Mês": [f"{ano}-{m:02d}" for m in range(1, 13)]})
+    df = meses.merge(df, on="Mês", how="left")
+    df['Gasto'] = df['Gasto'].astype(float).fillna(0.0)
+    df['Saldo'] = orcado - anterior - df['Gasto'].cumsum()
+    return df
@@ -0,0 +1,3 @@
+# Benchmarks do portal: bancos sintéticos em escalas configuráveis e medição headless das funções quentes e das páginas.
+# Uso: python -m benchmark --escala media --saida resultados.json  (veja python -m benchmark --help)
+from .dados_sinteticos import ESCALAS, gerar_banco
@@ -0,0 +1,74 @@
+import os
+import sys
+import json
+import argparse
+import platform
+import tempfile
+from datetime import datetime
+
+PASTA_APP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PASTA_APP not in sys.path: sys.path.insert(0, PASTA_APP)
+
+from benchmark.dados_sinteticos import ESCALAS, gerar_banco
+from benchmark.medicoes import medir_funcoes
+
+# --- EXECUÇÃO DOS BENCHMARKS ---
+# python -m benchmark --escala media --repeticoes 5 --saida bench_media.json [--comparar bench_anterior.json] [--sem-paginas]
+
+def _linhas_funcoes(funcoes):
+    for nome, modos in funcoes.items():
+        if nome.startswith("_"): continue
+        for modo, m in modos.items(): yield f"{nome} [{modo}]", m["mediana_ms"]
+
+def comparar(atual, anterior):
+    base = dict(_linhas_funcoes(anterior.get("funcoes", {})))
+    base.update({f"página {p}": m["mediana"] * 1000 for p, m in anterior.get("paginas", {}).items()})
+    novos = dict(_linhas_funcoes(atual["funcoes"]))
+    novos.update({f"página {p}": m["mediana"] * 1000 for p, m in atual.get("paginas", {}).items()})
+    print("\nComparação com a execução anterior (mediana):")
+    for nome, ms in novos.items():
+        if nome in base and base[nome] > 0: print(f"  {nome:<48} {base[nome]:9.1f} ms -> {ms:9.1f} ms  ({ms / base[nome]:5.2f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmark", description="Benchmarks do portal com bancos sintéticos")
+    parser.add_argument("--escala", choices=sorted(ESCALAS), default="media")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--banco", help="caminho do banco sintético (padrão: pasta temporária; reaproveitado com --reusar)")
+    parser.add_argument("--reusar", action="store_true", help="não regenera o banco se ele já existir")
+    parser.add_argument("--sem-paginas", action="store_true", help="pula as execuções de página inteira com AppTest")
+    parser.add_argument("--saida", help="grava os resultados em JSON")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+
+    caminho = args.banco or os.path.join(tempfile.gettempdir(), f"igreja_bench_{args.escala}.db")
+    if args.reusar and os.path.exists(caminho): contagem = None
+    else:
+        print(f"Gerando banco sintético ({args.escala}) em {caminho}...")
+        contagem = gerar_banco(caminho, args.escala)
+        print("  " + ", ".join(f"{t}: {n}" for t, n in contagem.items()))
+
+    # As funções de escrita alteram o banco: as páginas rodam sobre uma cópia gerada antes delas
+    resultado = {"escala": args.escala, "parametros": ESCALAS[args.escala], "contagem": contagem, "repeticoes": args.repeticoes,
+                 "gerado_em": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(), "plataforma": platform.platform()}
+    if not args.sem_paginas:
+        import medir_inicio
+        print("Medindo páginas com AppTest...")
+        paginas = medir_inicio.medir_app(args.repeticoes, banco_origem=caminho)
+        resultado["primeiro_run"] = paginas["primeiro_run"]
+        resultado["paginas"] = paginas["paginas"]
+    print("Medindo funções...")
+    resultado["funcoes"] = medir_funcoes(caminho, args.repeticoes)
+
+    for nome, ms in _linhas_funcoes(resultado["funcoes"]): print(f"  {nome:<48} {ms:9.1f} ms")
+    if "paginas" in resultado:
+        print(f"  {'primeiro run (Mural)':<48} {resultado['primeiro_run'] * 1000:9.1f} ms")
+        for pagina, m in resultado["paginas"].items():
+            print(f"  {'página ' + pagina:<48} {m['mediana'] * 1000:9.1f} ms" + (f"  ERROS: {m['erros']}" if m["erros"] else ""))
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f: json.dump(resultado, f, ensure_ascii=False, indent=2, default=str)
+        print(f"Resultados gravados em {args.saida}")
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f: comparar(resultado, json.load(f))
+
+if __name__ == "__main__":
+    main()
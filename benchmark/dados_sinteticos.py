@@ -0,0 +1,69 @@
+import os
+import random
+from datetime import date, timedelta
+import banco
+
+# --- GERADOR DE BANCOS SINTÉTICOS ---
+# Cria um igreja.db com o esquema real (mesmas migrações do app) e volumes parecidos com os de uma ala após alguns anos de uso.
+# A semente fixa garante o mesmo banco para a mesma escala: resultados de execuções diferentes ficam comparáveis.
+ESCALAS = {
+    "pequena": {"anos_despesas": 1, "despesas_por_mes": 15, "caravanas_por_mes": 40, "comunicados": 100, "atividades": 150, "tarefas": 50, "agenda": 100},
+    "media": {"anos_despesas": 3, "despesas_por_mes": 60, "caravanas_por_mes": 500, "comunicados": 1500, "atividades": 1200, "tarefas": 400, "agenda": 1000},
+    "grande": {"anos_despesas": 10, "despesas_por_mes": 200, "caravanas_por_mes": 3000, "comunicados": 10000, "atividades": 8000, "tarefas": 3000, "agenda": 6000},
+}
+MESES_CARAVANA = ["Janeiro", "Abril", "Julho", "Outubro"]
+ORGANIZACOES = ["Quórum de Elderes", "Sociedade de Socorro", "Moças", "Rapazes", "Primária", "Obra Missionária"]
+RESPONSAVEIS = ["BISPO", "1º CONSELHEIRO", "2º CONSELHEIRO", "SECRETÁRIO", "PAZ"]
+NOMES = ["Ana", "João", "Maria", "Pedro", "Paulo", "Lucas", "Júlia", "Marcos", "Sara", "Tiago", "Rute", "Davi"]
+SOBRENOMES = ["Silva", "Souza", "Oliveira", "Santos", "Lima", "Pereira", "Costa", "Almeida", "Ferreira", "Rocha"]
+
+def _data(rng, inicio, dias):
+    return (inicio + timedelta(days=rng.randrange(dias))).isoformat()
+
+def _texto(rng, palavras=20):
+    return " ".join(rng.choice(("reunião", "ala", "serviço", "jovens", "capela", "lanche", "conferência", "batismo", "visita", "família")) for _ in range(palavras))
+
+def gerar_banco(caminho, escala="media", semente=42):
+    # Gera (sobrescrevendo) o banco em `caminho` e devolve a contagem de linhas por tabela
+    params = ESCALAS[escala] if isinstance(escala, str) else escala
+    for sufixo in ("", "-wal", "-shm"):
+        if os.path.exists(caminho + sufixo): os.remove(caminho + sufixo)
+    rng = random.Random(semente)
+    pool = banco.PoolConexoes(caminho, tamanho=1)
+    banco.init_db(pool)
+    hoje = date.today()
+    inicio_hist = date(hoje.year - params["anos_despesas"] + 1, 1, 1)
+    dias_hist = (hoje - inicio_hist).days + 1
+    categorias = [r[0] for r in pool.consultar("SELECT categoria FROM orcamentos_iniciais")]
+
+    despesas = [(rng.choice(categorias), f"Despesa {_texto(rng, 3)}", round(rng.uniform(5, 400), 2), _data(rng, inicio_hist, dias_hist), rng.choice(NOMES))
+                for _ in range(params["anos_despesas"] * 12 * params["despesas_por_mes"])]
+    caravanas = []
+    for mes in MESES_CARAVANA:
+        for _ in range(params["caravanas_por_mes"]):
+            total = 200.0; pago = float(rng.choice((0, 50, 100, 150, 200)))
+            caravanas.append((f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)}", mes, pago, total, int(pago >= total)))
+    comunicados = [(_data(rng, inicio_hist, dias_hist), f"Aviso {i}", _texto(rng, 40), rng.choice(NOMES), "", None) for i in range(params["comunicados"])]
+    ano = date(hoje.year, 1, 1)
+    atividades = []
+    for _ in range(params["atividades"]):
+        h = rng.randrange(8, 21)
+        atividades.append((rng.choice(ORGANIZACOES), _texto(rng, 4), _data(rng, ano, 365), f"{h:02d}:00", f"{h + 1:02d}:30"))
+    tarefas = [(_data(rng, inicio_hist, dias_hist), f"Tarefa {_texto(rng, 5)}", rng.choice(("Pendente", "Concluido")), rng.choice(("Alta", "Média", "Baixa")), rng.choice(RESPONSAVEIS))
+               for _ in range(params["tarefas"])]
+    agenda = [(_data(rng, ano, 365), f"{rng.randrange(7, 22):02d}:{rng.choice(('00', '30'))}", f"Entrevista {rng.choice(NOMES)}", "Agendado") for _ in range(params["agenda"])]
+
+    with pool.transacao() as c:
+        c.executemany('INSERT INTO despesas (categoria, descricao, valor, data_despesa, responsavel) VALUES (?, ?, ?, ?, ?)', despesas)
+        c.executemany('INSERT INTO financeiro_caravanas (nome_irmao, mes_caravana, valor_pago, valor_total, quitado) VALUES (?, ?, ?, ?, ?)', caravanas)
+        c.executemany('INSERT INTO comunicados (data_postagem, titulo, mensagem, autor, link, imagem) VALUES (?, ?, ?, ?, ?, ?)', comunicados)
+        c.executemany('INSERT INTO planejamento_lideranca (organizacao, atividade, data_planejada, horario_inicio, horario_fim) VALUES (?, ?, ?, ?, ?)', atividades)
+        c.executemany('INSERT INTO tarefas_bispado (data_criacao, tarefa, status, prioridade, responsavel) VALUES (?, ?, ?, ?, ?)', tarefas)
+        c.executemany('INSERT INTO agenda_bispado (data_agenda, horario, nome_compromisso, status) VALUES (?, ?, ?, ?)', agenda)
+        # O gerador não é um consumidor do feed de alterações: descarta o log gerado pelos triggers
+        c.execute("DELETE FROM log_alteracoes")
+    with pool.conexao() as c: c.execute("PRAGMA optimize")
+    contagem = {t: pool.consultar(f"SELECT count(*) FROM {t}")[0][0]
+                for t in ("despesas", "financeiro_caravanas", "comunicados", "planejamento_lideranca", "tarefas_bispado", "agenda_bispado")}
+    pool.fechar()
+    return contagem
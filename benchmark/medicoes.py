@@ -0,0 +1,76 @@
+import time
+import statistics
+import banco
+import calendario
+import instrumentacao
+
+# --- MEDIÇÃO DAS FUNÇÕES QUENTES ---
+# "frio": cache de consultas zerado antes de cada chamada (custo real de SQL + pandas);
+# "quente": chamadas repetidas com o cache válido (o que um rerun do Streamlit normalmente paga).
+
+def resumo(tempos):
+    return {"mediana_ms": statistics.median(tempos) * 1000, "min_ms": min(tempos) * 1000, "max_ms": max(tempos) * 1000, "n": len(tempos)}
+
+def cronometrar(funcao, repeticoes, antes=None):
+    tempos = []
+    for _ in range(repeticoes):
+        if antes: antes()
+        t = time.perf_counter(); funcao(); tempos.append(time.perf_counter() - t)
+    return resumo(tempos)
+
+def _editar_caravana(mes, fracao=0.1):
+    # Simula uma edição no st.data_editor: altera o valor pago de uma fração das linhas do mês e grava a diferença
+    base = banco.ler_caravana_mes(mes)[banco.COLUNAS_EDITOR_CARAVANA + ['id']].reset_index(drop=True)
+    editado = base.copy()
+    alvo = editado.index[::max(1, int(1 / fracao))]
+    editado.loc[alvo, 'valor_pago'] = (editado.loc[alvo, 'valor_pago'] + 10) % 210
+    return lambda: banco.atualizar_lote_caravana(editado, base, mes)
+
+def _relatorio(nome, *args):
+    # relatorios.py (fpdf/xlsxwriter) só é importado quando uma medição de relatório roda, como no app
+    import relatorios
+    return getattr(relatorios, nome)(*args)
+
+def casos(ano, mes_calendario, mes_caravana):
+    # nome -> (função, mede frio, mede quente)
+    return {
+        "ler_dados(comunicados)": (lambda: banco.ler_dados("comunicados"), True, True),
+        "ler_dados(despesas)": (lambda: banco.ler_dados("despesas"), True, True),
+        "ler_dados(planejamento_lideranca)": (lambda: banco.ler_dados("planejamento_lideranca", "data_planejada ASC"), True, True),
+        "ler_pagina(comunicados)": (lambda: banco.ler_pagina("comunicados", limite=10), True, True),
+        "ler_caravana_mes": (lambda: banco.ler_caravana_mes(mes_caravana), True, True),
+        "get_resumo_orcamento": (banco.get_resumo_orcamento, True, True),
+        "gerar_calendario_gigante": (lambda: calendario.gerar_calendario_gigante(ano, mes_calendario, indice=calendario.indice_eventos(ano, mes_calendario)), True, False),
+        "calendario_ano_html": (lambda: calendario.calendario_ano_html(ano), True, True),
+        "caravana_excel": (lambda: _relatorio("caravana_excel", mes_caravana), True, False),
+        "caravana_pdf": (lambda: _relatorio("caravana_pdf", mes_caravana), True, False),
+        "calendario_pdf": (lambda: _relatorio("calendario_pdf", ano), True, False),
+        "orcamento_pdf": (lambda: _relatorio("orcamento_pdf"), True, False),
+    }
+
+def medir_funcoes(caminho, repeticoes=5, ano=None, mes_calendario=1, mes_caravana="Janeiro"):
+    from datetime import date
+    pool = banco.PoolConexoes(caminho)
+    avulsas = instrumentacao.AVULSAS
+    instrumentacao.AVULSAS = False  # as medições do benchmark não devem gravar linhas em metricas_desempenho
+    try:
+        with banco.com_pool(pool):
+            limpar = pool.cache.limpar
+            resultado = {}
+            for nome, (funcao, frio, quente) in casos(ano or date.today().year, mes_calendario, mes_caravana).items():
+                resultado[nome] = {}
+                if frio: resultado[nome]["frio"] = cronometrar(funcao, repeticoes, antes=limpar)
+                if quente:
+                    funcao()
+                    resultado[nome]["quente"] = cronometrar(funcao, repeticoes)
+            # Escrita: cada repetição grava uma nova diferença (a base é relida a cada vez)
+            tempos = []
+            for _ in range(repeticoes):
+                gravar = _editar_caravana(mes_caravana)
+                t = time.perf_counter(); gravar(); tempos.append(time.perf_counter() - t)
+            resultado["atualizar_lote_caravana"] = {"frio": resumo(tempos)}
+            resultado["_cache"] = pool.cache.estatisticas()
+            return resultado
+    finally:
+        instrumentacao.AVULSAS = avulsas
+        pool.fechar()
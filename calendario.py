@@ -0,0 +1,79 @@
+import calendar
+from datetime import date
+from html import escape
+import banco
+import recorrencias
+import conflitos
+from instrumentacao import medido
+
+# --- MOTOR DO CALENDÁRIO ---
+# Os eventos são agrupados por data uma única vez (por versão dos dados) e cada célula faz só um lookup no dicionário.
+DIAS_SEMANA_CURTO = ["Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom"]
+DIAS_SEMANA_LONGO = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo"]
+MESES_PT = {1:"Janeiro", 2:"Fevereiro", 3:"Março", 4:"Abril", 5:"Maio", 6:"Junho", 7:"Julho", 8:"Agosto", 9:"Setembro", 10:"Outubro", 11:"Novembro", 12:"Dezembro"}
+_CAL = calendar.Calendar(firstweekday=0)
+
+def indexar_eventos(df_atividades):
+    indice = {}
+    if df_atividades is None or df_atividades.empty or 'data_planejada' not in df_atividades.columns: return indice
+    for data_str, org, atv in zip(df_atividades['data_planejada'], df_atividades['organizacao'], df_atividades['atividade']):
+        indice.setdefault(data_str, []).append(f"{org}: {atv}")
+    return indice
+
+def gerar_calendario_html(ano, mes, datas_ativas, datas_conflito=()):
+    if not isinstance(datas_ativas, (set, frozenset, dict)): datas_ativas = set(datas_ativas)
+    hoje = date.today().strftime("%Y-%m-%d")
+    prefixo = f"{ano}-{mes:02d}-"
+    partes = [f"<div class='cal-header'>{MESES_PT[mes]} {ano}</div><div class='cal-container'>"]
+    partes.extend(f"<div class='cal-weekday'>{ds}</div>" for ds in DIAS_SEMANA_CURTO)
+    for semana in _CAL.monthdayscalendar(ano, mes):
+        for dia in semana:
+            if dia == 0: partes.append("<div class='cal-day cal-empty'></div>"); continue
+            data_str = f"{prefixo}{dia:02d}"
+            classe = "cal-day"
+            if data_str in datas_ativas: classe += " cal-active"
+            if data_str in datas_conflito: classe += " cal-conflict"
+            if data_str == hoje: classe += " cal-today"
+            partes.append(f"<div class='{classe}'>{dia}</div>")
+    partes.append("</div>")
+    return "".join(partes)
+
+@medido()
+def gerar_calendario_gigante(ano, mes, df_atividades=None, indice=None, conflitos_dia=None):
+    # conflitos_dia: data -> descrições dos conflitos de horário (dias marcados em vermelho, ver conflitos.py)
+    if indice is None: indice = indexar_eventos(df_atividades)
+    conflitos_dia = conflitos_dia or {}
+    prefixo = f"{ano}-{mes:02d}-"
+    partes = ["<div class='cal-giant-container'>"]
+    partes.extend(f"<div style='font-weight:bold;'>{ds}</div>" for ds in DIAS_SEMANA_LONGO)
+    for semana in _CAL.monthdayscalendar(ano, mes):
+        for dia in semana:
+            if dia == 0: partes.append("<div></div>"); continue
+            eventos = indice.get(f"{prefixo}{dia:02d}")
+            if eventos:
+                choques = conflitos_dia.get(f"{prefixo}{dia:02d}")
+                tooltip = escape("Atividades: " + " | ".join(eventos) + (" | ⚠️ Conflito: " + " | ".join(choques) if choques else ""), quote=True)
+                classe = "cal-giant-day cal-giant-active" + (" cal-giant-conflict" if choques else "")
+                partes.append(f"<div class='{classe}' title='{tooltip}'><div>{dia}</div><div class='event-dot'></div></div>")
+            else:
+                partes.append(f"<div class='cal-giant-day' title='Dia {dia}'><div>{dia}</div></div>")
+    partes.append("</div>")
+    return "".join(partes)
+
+# --- VERSÕES EM CACHE (invalidadas quando o planejamento ou as recorrências são alterados) ---
+def indice_eventos(ano, mes=None):
+    # Só o período exibido (o mês, ou o ano inteiro): as atividades recorrentes são expandidas apenas para ele
+    inicio, fim = recorrencias.periodo_mes(ano, mes) if mes else recorrencias.periodo_ano(ano)
+    return banco.obter_pool().cache.obter(("cal_indice", ano, mes), recorrencias.TABELAS,
+                                          lambda: indexar_eventos(recorrencias.atividades_periodo(inicio, fim)))
+
+@medido()
+def calendario_gigante_mes(ano, mes):
+    return banco.obter_pool().cache.obter(("cal_gigante", ano, mes), recorrencias.TABELAS,
+                                          lambda: gerar_calendario_gigante(ano, mes, indice=indice_eventos(ano, mes), conflitos_dia=conflitos.datas_em_conflito(ano, mes)))
+
+@medido()
+def calendario_ano_html(ano):
+    # Visão anual: 12 mini-calendários reaproveitando o mesmo índice de eventos
+    indice, em_conflito = indice_eventos(ano), conflitos.datas_em_conflito(ano)
+    return [gerar_calendario_html(ano, mes, indice, em_conflito) for mes in range(1, 13)]
@@ -0,0 +1,101 @@
+import heapq
+from bisect import bisect_left
+import pandas as pd
+import banco
+import recorrencias
+from instrumentacao import medido
+
+# --- CONFLITOS DE HORÁRIO NO PLANEJAMENTO ---
+# A ala usa um prédio só: duas atividades no mesmo dia cujos horários se cruzam são um conflito, seja qual for a organização.
+# IndiceIntervalos guarda, por data, os intervalos ordenados pelo início (em minutos do dia):
+#   - na gravação, as atividades que cruzam uma nova saem de uma busca binária (só quem começa depois de
+#     "início - maior duração do dia" e antes do término pode se cruzar), sem comparar com todas;
+#   - o relatório do período é uma varredura por data com um heap dos términos das atividades em andamento:
+#     O(n log n) para ordenar e varrer, mais um passo por par em conflito.
+# As atividades vêm de recorrencias.atividades_periodo (avulsas + ocorrências das regras).
+DURACAO_PADRAO = 60  # minutos, quando o término falta ou não é depois do início
+COLUNAS = ["data", "horario_a", "organizacao_a", "atividade_a", "horario_b", "organizacao_b", "atividade_b"]
+
+def _minutos(hora):
+    try: h, m = str(hora).split(":")[:2]; return int(h) * 60 + int(m)
+    except (ValueError, TypeError): return None
+
+def _intervalo(h_ini, h_fim):
+    inicio = _minutos(h_ini) if h_ini else None
+    if inicio is None: return None  # atividade sem horário não ocupa o prédio num intervalo conhecido
+    fim = _minutos(h_fim) if h_fim else None
+    return inicio, fim if fim is not None and fim > inicio else inicio + DURACAO_PADRAO
+
+def _rotulo_horario(inicio, fim):
+    return f"{inicio // 60:02d}:{inicio % 60:02d}-{fim // 60:02d}:{fim % 60:02d}"
+
+
+class IndiceIntervalos:
+    """Intervalos de horário das atividades agrupados por data e ordenados pelo início."""
+
+    def __init__(self, df):
+        por_data = {}
+        for data, h_ini, h_fim, org, atv in zip(df['data_planejada'], df['horario_inicio'], df['horario_fim'], df['organizacao'], df['atividade']):
+            intervalo = _intervalo(h_ini, h_fim)
+            if intervalo is None or not data: continue
+            por_data.setdefault(data, []).append((*intervalo, org, atv))
+        # data -> (inícios ordenados, itens na mesma ordem, maior duração do dia)
+        self._datas = {}
+        for data, itens in por_data.items():
+            itens.sort(key=lambda i: (i[0], i[1]))
+            self._datas[data] = ([i[0] for i in itens], itens, max(i[1] - i[0] for i in itens))
+
+    def sobrepostos(self, data, h_ini, h_fim):
+        # [(data, horário, organização, atividade)] das atividades da data que se cruzam com o intervalo
+        intervalo = _intervalo(h_ini, h_fim)
+        entrada = self._datas.get(data)
+        if intervalo is None or entrada is None: return []
+        inicios, itens, maior = entrada
+        lo, hi = bisect_left(inicios, intervalo[0] - maior + 1), bisect_left(inicios, intervalo[1])
+        return [(data, _rotulo_horario(i, f), org, atv) for i, f, org, atv in itens[lo:hi] if f > intervalo[0]]
+
+    def conflitos(self):
+        # Varredura por data: ao chegar uma atividade, saem do heap as que já terminaram; as que sobram cruzam com ela
+        linhas = []
+        for data in sorted(self._datas):
+            itens = self._datas[data][1]
+            em_andamento = []
+            for pos, (inicio, fim, org, atv) in enumerate(itens):
+                while em_andamento and em_andamento[0][0] <= inicio: heapq.heappop(em_andamento)
+                for _, outro in sorted(em_andamento, key=lambda e: e[1]):
+                    a_ini, a_fim, a_org, a_atv = itens[outro]
+                    linhas.append((data, _rotulo_horario(a_ini, a_fim), a_org, a_atv, _rotulo_horario(inicio, fim), org, atv))
+                heapq.heappush(em_andamento, (fim, pos))
+        return pd.DataFrame(linhas, columns=COLUNAS)
+
+
+# --- CONSULTAS (em cache até a próxima alteração do planejamento ou das recorrências) ---
+@medido()
+def conflitos_periodo(inicio, fim):
+    inicio, fim = str(inicio)[:10], str(fim)[:10]
+    return banco.obter_pool().cache.obter(("conflitos", inicio, fim), recorrencias.TABELAS,
+                                          lambda: IndiceIntervalos(recorrencias.atividades_periodo(inicio, fim)).conflitos()).copy(deep=False)
+
+def conflitos_ano(ano):
+    return conflitos_periodo(*recorrencias.periodo_ano(ano))
+
+def datas_em_conflito(ano, mes=None):
+    # data -> ["19:00-20:30 Moças: Noite x 19:30-21:00 Rapazes: Noite", ...] para marcar os dias no calendário
+    df = conflitos_periodo(*(recorrencias.periodo_mes(ano, mes) if mes else recorrencias.periodo_ano(ano)))
+    datas = {}
+    for r in df.itertuples(index=False):
+        datas.setdefault(r.data, []).append(f"{r.horario_a} {r.organizacao_a}: {r.atividade_a} x {r.horario_b} {r.organizacao_b}: {r.atividade_b}")
+    return datas
+
+# --- VERIFICAÇÃO NA GRAVAÇÃO ---
+def sobrepostas(data, h_ini, h_fim):
+    # Atividades já marcadas na data (avulsas e recorrentes) que se cruzam com o horário
+    data = str(data)[:10]
+    return IndiceIntervalos(recorrencias.atividades_periodo(data, data)).sobrepostos(data, h_ini, h_fim)
+
+def sobrepostas_regra(datas, h_ini, h_fim):
+    # Para as ocorrências (em ordem) de uma regra nova: um índice só para o período coberto por elas
+    datas = [str(d)[:10] for d in datas]
+    if not datas: return []
+    indice = IndiceIntervalos(recorrencias.atividades_periodo(datas[0], datas[-1]))
+    return [c for d in datas for c in indice.sobrepostos(d, h_ini, h_fim)]
@@ -0,0 +1,212 @@
+import os
+import time
+from collections import deque
+from datetime import datetime, timedelta
+import banco
+
+# --- FILA PERSISTENTE DE MENSAGENS (OUTBOX) ---
+# O agendador só ENFILEIRA; um "drenador" envia pela fila usando um transporte plugável.
+# Cada mensagem tem uma chave de idempotência: reenfileirar a mesma chave não duplica o envio,
+# e um processo interrompido retoma de onde parou na próxima drenagem.
+MAX_TENTATIVAS = 5
+BACKOFF_BASE_SEG = 60  # 1, 2, 4, 8... minutos entre tentativas
+FORMATO_DATA = "%Y-%m-%d %H:%M:%S"
+LOTE_MAX = 10  # mensagens coladas na mesma conversa aberta
+# Recorte de tela da caixa "Digite uma mensagem" do WhatsApp Web, usado para saber quando a conversa carregou
+IMAGEM_PRONTIDAO = "whatsapp_pronto.png"
+
+def _agora():
+    return datetime.now().strftime(FORMATO_DATA)
+
+def enfileirar(chave, tipo_destino, destino, texto, nome_destino=None):
+    # Devolve True se a mensagem entrou na fila, False se a chave já existia (duplicada)
+    pool = banco.obter_pool()
+    with pool.transacao() as c:
+        cur = c.execute('INSERT OR IGNORE INTO fila_mensagens (chave, tipo_destino, destino, nome_destino, texto, criado_em, proxima_tentativa) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                        (chave, tipo_destino, destino, nome_destino, texto, _agora(), _agora()))
+        return cur.rowcount == 1
+
+def recuperar_interrompidas():
+    # Mensagens que ficaram "enviando" por queda do processo voltam para a fila (entrega pelo menos uma vez)
+    with banco.obter_pool().transacao() as c:
+        return c.execute("UPDATE fila_mensagens SET status = 'pendente' WHERE status = 'enviando'").rowcount
+
+def _reservar_lote(tamanho_max=LOTE_MAX):
+    # Reserva a mensagem pronta mais antiga e as demais prontas para o MESMO destino: são enviadas numa única abertura da conversa
+    agora = _agora()
+    with banco.obter_pool().transacao() as c:
+        primeira = c.execute("SELECT tipo_destino, destino FROM fila_mensagens WHERE status = 'pendente' AND proxima_tentativa <= ? ORDER BY id LIMIT 1", (agora,)).fetchone()
+        if primeira is None: return []
+        linhas = c.execute("SELECT id, chave, tipo_destino, destino, nome_destino, texto, tentativas FROM fila_mensagens "
+                           "WHERE status = 'pendente' AND proxima_tentativa <= ? AND tipo_destino = ? AND destino = ? ORDER BY id LIMIT ?",
+                           (agora, primeira[0], primeira[1], tamanho_max)).fetchall()
+        c.executemany("UPDATE fila_mensagens SET status = 'enviando' WHERE id = ?", [(l[0],) for l in linhas])
+    return [dict(zip(("id", "chave", "tipo_destino", "destino", "nome_destino", "texto", "tentativas"), l)) for l in linhas]
+
+def marcar_enviada(id_msg):
+    banco.obter_pool().executar("UPDATE fila_mensagens SET status = 'enviado', enviado_em = ?, ultimo_erro = NULL WHERE id = ?", (_agora(), id_msg))
+
+def marcar_falha(id_msg, tentativas, erro):
+    tentativas += 1
+    if tentativas >= MAX_TENTATIVAS:
+        banco.obter_pool().executar("UPDATE fila_mensagens SET status = 'falhou', tentativas = ?, ultimo_erro = ? WHERE id = ?", (tentativas, str(erro), id_msg))
+        return
+    proxima = (datetime.now() + timedelta(seconds=BACKOFF_BASE_SEG * 2 ** (tentativas - 1))).strftime(FORMATO_DATA)
+    banco.obter_pool().executar("UPDATE fila_mensagens SET status = 'pendente', tentativas = ?, proxima_tentativa = ?, ultimo_erro = ? WHERE id = ?",
+                                (tentativas, proxima, str(erro), id_msg))
+
+def drenar(transporte, limite=None):
+    enviadas = falhas = 0
+    while limite is None or enviadas + falhas < limite:
+        lote = _reservar_lote()
+        if not lote: break
+        confirmadas = set()
+        def ao_enviar(msg):
+            marcar_enviada(msg["id"]); confirmadas.add(msg["id"])
+        erro = "envio interrompido"
+        try:
+            transporte.enviar_lote(lote, ao_enviar)
+        except Exception as e:
+            erro = e
+            print(f"❌ Falha ao enviar para {lote[0]['nome_destino'] or lote[0]['destino']}: {e}")
+        for msg in lote:
+            if msg["id"] in confirmadas: enviadas += 1
+            else:
+                marcar_falha(msg["id"], msg["tentativas"], erro); falhas += 1
+    return enviadas, falhas
+
+def resumo_fila():
+    return dict(banco.obter_pool().consultar("SELECT status, count(*) FROM fila_mensagens GROUP BY status"))
+
+# --- PRONTIDÃO DA PÁGINA E ESPERA ADAPTATIVA ---
+class SondaTela:
+    """Considera o WhatsApp Web pronto quando a imagem de referência (caixa de mensagem) aparece na tela."""
+
+    def __init__(self, pyautogui, imagem=IMAGEM_PRONTIDAO):
+        self.pyautogui = pyautogui
+        self.imagem = imagem
+
+    def disponivel(self):
+        return os.path.exists(self.imagem)
+
+    def iniciar(self):
+        pass
+
+    def pronto(self):
+        try: return self.pyautogui.locateOnScreen(self.imagem) is not None
+        except Exception: return False  # versões novas do pyautogui lançam exceção quando não encontram
+
+
+class SondaFalsa:
+    """Sonda para simulações offline: a página "carrega" depois de um tempo fixo."""
+
+    def __init__(self, segundos_ate_pronto=0.0):
+        self.segundos_ate_pronto = segundos_ate_pronto
+        self._inicio = None
+
+    def iniciar(self):
+        self._inicio = time.monotonic()
+
+    def pronto(self):
+        return time.monotonic() - self._inicio >= self.segundos_ate_pronto
+
+
+class EsperaAdaptativa:
+    """Limite de espera aprendido dos tempos de carga recentes (p95 x margem), em vez de um sleep fixo."""
+
+    def __init__(self, inicial=50.0, minimo=5.0, maximo=120.0, margem=1.5, janela=20, intervalo=0.5):
+        self.inicial, self.minimo, self.maximo, self.margem, self.intervalo = inicial, minimo, maximo, margem, intervalo
+        self.amostras = deque(maxlen=janela)
+
+    def limite(self):
+        if not self.amostras: return self.inicial
+        ordenadas = sorted(self.amostras)
+        p95 = ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.95))]
+        return min(max(p95 * self.margem, self.minimo), self.maximo)
+
+    def aguardar(self, sonda):
+        limite = self.limite()
+        inicio = time.monotonic()
+        sonda.iniciar()
+        while True:
+            decorrido = time.monotonic() - inicio
+            if sonda.pronto():
+                self.amostras.append(decorrido)
+                return decorrido
+            if decorrido >= limite:
+                # A carga passou do limite: registra uma amostra acima dele (até o máximo), senão o p95 só poderia
+                # cair e, depois de cargas rápidas, toda página um pouco mais lenta estouraria o limite para sempre
+                self.amostras.append(min(limite * self.margem, self.maximo))
+                raise TimeoutError(f"página não ficou pronta em {limite:.1f}s")
+            time.sleep(self.intervalo)
+
+
+# --- TRANSPORTES ---
+# Interface: enviar_lote(msgs, ao_enviar) envia mensagens de um mesmo destino e chama ao_enviar(msg) a cada envio confirmado.
+class TransporteStub:
+    """Transporte local (sem navegador): guarda as mensagens em memória. Útil para simulações e testes."""
+
+    def __init__(self, falhar_vezes=0, sonda=None, espera=None):
+        self.enviadas = []
+        self.conversas_abertas = 0
+        self._falhas_restantes = falhar_vezes
+        self.sonda = sonda or SondaFalsa()
+        self.espera = espera or EsperaAdaptativa(inicial=5.0, minimo=0.1, intervalo=0.01)
+
+    def enviar_lote(self, msgs, ao_enviar):
+        self.conversas_abertas += 1
+        self.espera.aguardar(self.sonda)
+        for msg in msgs:
+            if self._falhas_restantes > 0:
+                self._falhas_restantes -= 1
+                raise RuntimeError("falha simulada")
+            self.enviadas.append(msg)
+            print(f"🧪 [simulação] {msg['tipo_destino']} {msg['nome_destino'] or msg['destino']}:\n{msg['texto']}\n")
+            ao_enviar(msg)
+
+
+class TransporteWhatsAppWeb:
+    """Envio via WhatsApp Web automatizando o navegador (pyautogui + área de transferência)."""
+
+    def __init__(self, sonda=None, espera=None, espera_sem_sonda=50, pausa_acao=0.5):
+        # Importados aqui para que a fila e o transporte stub funcionem em máquinas sem interface gráfica
+        import pyperclip, pyautogui, webbrowser
+        self.pyperclip, self.pyautogui, self.webbrowser = pyperclip, pyautogui, webbrowser
+        self.sonda = sonda or SondaTela(pyautogui)
+        self.espera = espera or EsperaAdaptativa()
+        self.espera_sem_sonda = espera_sem_sonda
+        self.pausa_acao = pausa_acao
+
+    def _aguardar_carga(self, nome):
+        # Sem a imagem de referência não há como saber quando a página carregou: mantém a espera fixa antiga
+        if isinstance(self.sonda, SondaTela) and not self.sonda.disponivel():
+            print(f"⏳ Carregando conversa de {nome} (Aguarde {self.espera_sem_sonda}s; salve {IMAGEM_PRONTIDAO} para espera adaptativa)...")
+            time.sleep(self.espera_sem_sonda)
+            return
+        print(f"⏳ Carregando conversa de {nome} (limite {self.espera.limite():.0f}s)...")
+        print(f"✅ Pronta em {self.espera.aguardar(self.sonda):.1f}s")
+
+    def enviar_lote(self, msgs, ao_enviar):
+        pyautogui = self.pyautogui
+        primeira = msgs[0]
+        if primeira["tipo_destino"] == "grupo": self.webbrowser.open(f"https://web.whatsapp.com/accept?code={primeira['destino']}")
+        else: self.webbrowser.open(f"https://web.whatsapp.com/send?phone={primeira['destino']}")
+        self._aguardar_carga(primeira["nome_destino"] or primeira["destino"])
+
+        # --- ESTRATÉGIA DE FOCO ROBUSTA ---
+        # 1. Clica no canto superior para focar na janela do navegador; 2. ESC força o foco na caixa de texto
+        pyautogui.click(10, 10)
+        pyautogui.press('esc')
+        time.sleep(self.pausa_acao)
+        for msg in msgs:
+            self.pyperclip.copy(msg["texto"])
+            pyautogui.hotkey('ctrl', 'v')
+            time.sleep(self.pausa_acao)
+            pyautogui.press('enter')
+            time.sleep(self.pausa_acao)
+            ao_enviar(msg)
+
+        # 3. Fecha a aba da conversa individual (a aba do grupo fica aberta, como antes)
+        if primeira["tipo_destino"] != "grupo":
+            time.sleep(self.pausa_acao * 2)
+            pyautogui.hotkey('ctrl', 'w')
@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import banco
+import backup
+
+# --- GERAÇÃO DE RELATÓRIOS EM LOTE (SEM STREAMLIT) ---
+# Usa os mesmos geradores do app (relatorios.py) direto sobre o igreja.db e grava os arquivos numa pasta,
+# um relatório por tarefa num pool de processos. Pode ser agendado junto com o agendador_whatsapp.py, p.ex.:
+#   python gerar_relatorios.py --saida relatorios/2026-10 --meses Julho Outubro
+# Os processos leem de uma cópia do banco tirada no início (backup.instantaneo): o lote inteiro sai do mesmo
+# estado dos dados e nenhuma leitura longa fica aberta no banco que o app está gravando (--ao-vivo lê direto dele).
+CAMINHO_BANCO = 'igreja.db'
+MESES_CARAVANA = ["Janeiro", "Abril", "Julho", "Outubro"]
+TIPOS = ("calendario", "caravana", "orcamento")
+
+def listar_tarefas(tipos, meses, ano):
+    # (arquivo, função de relatorios.py, argumentos); nomes iguais aos dos botões de download do app
+    tarefas = []
+    if "calendario" in tipos: tarefas.append((f"Calendario_Ala_{ano}.pdf", "calendario_pdf", (ano,)))
+    if "caravana" in tipos:
+        for mes in meses:
+            tarefas.append((f"Caravana_{mes}.xlsx", "caravana_excel", (mes,)))
+            tarefas.append((f"Caravana_{mes}.pdf", "caravana_pdf", (mes,)))
+    if "orcamento" in tipos: tarefas.append((f"Orcamento_Ala_{datetime.now().strftime('%Y-%m-%d')}.pdf", "orcamento_pdf", ()))
+    return tarefas
+
+def _iniciar_processo(caminho_banco, somente_leitura):
+    # Cada processo do pool abre a sua própria conexão (conexões SQLite não atravessam processos)
+    banco.configurar(caminho_banco, tamanho=1, somente_leitura=somente_leitura)
+
+def gerar(arquivo, funcao, args, pasta):
+    import relatorios
+    inicio = time.perf_counter()
+    dados = getattr(relatorios, funcao)(*args)
+    destino = os.path.join(pasta, arquivo)
+    tmp = f"{destino}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f: f.write(dados)
+    os.replace(tmp, destino)  # um arquivo pela metade nunca aparece na pasta de saída
+    return arquivo, len(dados), time.perf_counter() - inicio
+
+def gerar_lote(caminho_banco, pasta, tarefas, processos=None, somente_leitura=False):
+    # Devolve (gerados, falhas): [(arquivo, bytes, segundos)] e [(arquivo, erro)]
+    os.makedirs(pasta, exist_ok=True)
+    gerados, falhas = [], []
+    with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_processo, initargs=(caminho_banco, somente_leitura)) as executor:
+        futuros = {executor.submit(gerar, arquivo, funcao, args, pasta): arquivo for arquivo, funcao, args in tarefas}
+        for futuro in as_completed(futuros):
+            try: gerados.append(futuro.result())
+            except Exception as e: falhas.append((futuros[futuro], e))
+    return gerados, falhas
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera os relatórios da Ala (PDF/Excel) em lote, sem o servidor web")
+    parser.add_argument("--banco", default=CAMINHO_BANCO, help="caminho do igreja.db")
+    parser.add_argument("--saida", default=os.path.join("relatorios_gerados", datetime.now().strftime("%Y-%m-%d")), help="pasta de saída")
+    parser.add_argument("--meses", nargs="+", choices=MESES_CARAVANA, default=MESES_CARAVANA, help="meses de caravana")
+    parser.add_argument("--ano", type=int, default=2026, help="ano do calendário")
+    parser.add_argument("--tipos", nargs="+", choices=TIPOS, default=list(TIPOS))
+    parser.add_argument("--processos", type=int, default=None, help="processos em paralelo (padrão: número de CPUs)")
+    parser.add_argument("--ao-vivo", action="store_true", help="lê direto do banco em vez de uma cópia instantânea")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.banco): sys.exit(f"❌ Banco não encontrado: {args.banco}")
+    # Migrações pendentes são aplicadas uma vez aqui, antes de abrir os processos
+    banco.configurar(args.banco, tamanho=1)
+    banco.init_db()
+    banco.obter_pool().fechar()
+
+    tarefas = listar_tarefas(args.tipos, args.meses, args.ano)
+    inicio = time.perf_counter()
+    if args.ao_vivo: gerados, falhas = gerar_lote(args.banco, args.saida, tarefas, args.processos)
+    else:
+        with backup.instantaneo(args.banco) as copia: gerados, falhas = gerar_lote(copia, args.saida, tarefas, args.processos, somente_leitura=True)
+    for arquivo, tamanho, segundos in sorted(gerados): print(f"✅ {arquivo} ({tamanho / 1024:.1f} KB, {segundos:.2f}s)")
+    for arquivo, erro in falhas: print(f"❌ {arquivo}: {erro}")
+    print(f"📁 {len(gerados)} relatório(s) em {args.saida} ({time.perf_counter() - inicio:.1f}s)")
+    if falhas: sys.exit(1)
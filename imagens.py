@@ -0,0 +1,85 @@
+import os
+import glob
+import hashlib
+from functools import lru_cache
+
+# --- PIPELINE DE IMAGENS ---
+# Originais ficam em posts/ com o nome = hash do conteúdo (reenvios do mesmo arquivo não duplicam nada).
+# Variantes redimensionadas (miniatura para o mural, exibição para o "ver completa", logo da barra lateral)
+# são derivadas e regeneráveis: ficam em cache_imagens/ dentro da pasta do original e são criadas no upload ou, para imagens
+# antigas, no primeiro acesso. Cada ala tem a sua pasta de posts (alas.py), e portanto o seu cache: apagar a imagem de uma
+# ala nunca leva as variantes de outra que tenha postado o mesmo arquivo.
+PASTA_CACHE = 'cache_imagens'
+# tipo: (largura máxima em px, qualidade JPEG)
+VARIANTES = {"miniatura": (480, 70), "exibicao": (1280, 82), "logo": (200, None)}
+
+def _hash_bytes(dados):
+    return hashlib.sha256(dados).hexdigest()
+
+@lru_cache(maxsize=1024)
+def _chave_arquivo(caminho, mtime, tamanho):
+    # Originais do pipeline já têm o hash no nome; imagens antigas (nome com timestamp) são hasheadas uma vez por processo
+    nome = os.path.splitext(os.path.basename(caminho))[0]
+    if len(nome) == 64 and all(ch in "0123456789abcdef" for ch in nome): return nome
+    with open(caminho, "rb") as f: return _hash_bytes(f.read())
+
+def _chave(caminho):
+    st_arq = os.stat(caminho)
+    return _chave_arquivo(os.path.abspath(caminho), st_arq.st_mtime_ns, st_arq.st_size)
+
+def pasta_cache(caminho):
+    return os.path.join(os.path.dirname(os.path.abspath(caminho)), PASTA_CACHE)
+
+def _gravar_atomico(caminho, escrever):
+    tmp = f"{caminho}.tmp{os.getpid()}"
+    escrever(tmp)
+    os.replace(tmp, caminho)
+
+def _gerar_variante(origem, destino, largura, qualidade):
+    from PIL import Image, ImageOps  # import tardio: só quem gera variantes paga o custo
+    with Image.open(origem) as im:
+        im = ImageOps.exif_transpose(im)
+        im.thumbnail((largura, largura * 4))
+        if destino.endswith(".png"):
+            _gravar_atomico(destino, lambda tmp: im.save(tmp, "PNG", optimize=True))
+        else:
+            if im.mode not in ("RGB", "L"):
+                fundo = Image.new("RGB", im.size, (255, 255, 255))
+                fundo.paste(im, mask=im.convert("RGBA").split()[-1])
+                im = fundo
+            _gravar_atomico(destino, lambda tmp: im.save(tmp, "JPEG", quality=qualidade, optimize=True, progressive=True))
+
+def variante(caminho, tipo):
+    # Caminho da variante pronta (gera se ainda não existir); None se a imagem original não existe
+    if not caminho or not os.path.exists(str(caminho)): return None
+    largura, qualidade = VARIANTES[tipo]
+    ext = ".png" if str(caminho).lower().endswith(".png") else ".jpg"
+    pasta = pasta_cache(caminho)
+    destino = os.path.join(pasta, f"{_chave(caminho)}_{tipo}{ext}")
+    if not os.path.exists(destino):
+        os.makedirs(pasta, exist_ok=True)
+        try: _gerar_variante(caminho, destino, largura, qualidade)
+        except Exception: return str(caminho)  # imagem que o Pillow não abre: serve o original
+    return destino
+
+def salvar_upload(dados, nome_original, pasta):
+    # Grava o original endereçado pelo conteúdo e já prepara as variantes do mural
+    ext = os.path.splitext(nome_original)[1].lower() or ".jpg"
+    caminho = os.path.join(pasta, f"{_hash_bytes(dados)}{ext}")
+    if not os.path.exists(caminho):
+        os.makedirs(pasta, exist_ok=True)
+        def escrever(tmp):
+            with open(tmp, "wb") as f: f.write(dados)
+        _gravar_atomico(caminho, escrever)
+    for tipo in ("miniatura", "exibicao"): variante(caminho, tipo)
+    return caminho
+
+def remover_imagem(caminho):
+    # Apaga o original e todas as suas variantes
+    if not caminho or not os.path.exists(str(caminho)): return
+    chave = _chave(caminho)
+    for derivada in glob.glob(os.path.join(pasta_cache(caminho), f"{chave}_*")):
+        try: os.remove(derivada)
+        except OSError: pass
+    try: os.remove(caminho)
+    except OSError: pass
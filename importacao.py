@@ -0,0 +1,343 @@
+import io
+import os
+import re
+import csv
+import sys
+import math
+import time
+import sqlite3
+import argparse
+import unicodedata
+from datetime import date, datetime
+import banco
+from instrumentacao import medido
+
+# --- IMPORTAÇÃO EM LOTE (PLANILHA .xlsx OU CSV) ---
+# Carrega despesas, caravanas e indicadores de uma planilha sem passar pelos formulários do app.
+# O arquivo é lido em blocos (openpyxl em modo read_only, csv linha a linha) e cada linha é validada e normalizada:
+# categorias conferidas com orcamentos_iniciais, datas em AAAA-MM-DD, valores em "1.234,56" ou 1234.56, meses de caravana.
+# As linhas válidas são gravadas com executemany, um bloco por transação; com simular=True nada é gravado e o
+# relatório mostra o que seria importado. Por padrão, um arquivo com erros não grava nada (ignorar_invalidas grava o resto).
+# Linha de comando:
+#   python importacao.py despesas despesas_2025.xlsx --simular
+#   python importacao.py caravanas caravana.csv --banco alas/centro/igreja.db
+CAMINHO_BANCO = 'igreja.db'
+TAMANHO_BLOCO = 500
+MAX_ERROS_RELATORIO = 50
+
+# Colunas de cada tipo: campo -> nomes aceitos no cabeçalho (comparados sem acento, caixa, espaços e pontuação)
+COLUNAS = {
+    "despesas": {"categoria": ("categoria", "organizacao", "org"), "descricao": ("descricao", "historico", "item"),
+                 "valor": ("valor", "valorr", "valorgasto", "valorgastor"), "data": ("data", "datadespesa", "dia"),
+                 "responsavel": ("responsavel", "resp")},
+    "caravanas": {"nome": ("nome", "nomeirmao", "nomedoirmao", "nomedoirmaoa", "irmao", "membro"), "mes": ("mes", "mescaravana", "caravana"),
+                  "valor_total": ("valortotal", "valortotalr", "total"), "valor_pago": ("valorpago", "valorpagor", "pago"),
+                  "quitado": ("quitado",)},
+    "indicadores": {"indicador": ("indicador", "nome"), "atual": ("atual", "valoratual", "valor"), "meta": ("meta",), "data": ("data",)},
+}
+OBRIGATORIAS = {"despesas": ("categoria", "descricao", "valor", "data"), "caravanas": ("nome", "mes", "valor_total"), "indicadores": ("indicador", "atual")}
+TIPOS = tuple(COLUNAS)
+# Nomes das organizações usados no planejamento (e comuns nas planilhas) -> categoria do orçamento
+APELIDOS_CATEGORIA = {"sociedadedesocorro": "Soc. Socorro", "quorumdeelderes": "Quórum", "jovensadultossolteiros": "JAS"}
+SIM = {"sim", "s", "x", "1", "true", "verdadeiro", "quitado", "pago"}
+NAO = {"nao", "n", "", "0", "false", "falso", "pendente"}
+
+
+class RelatorioImportacao:
+    """Resultado de uma importação (ou simulação): contagens, totais e erros por linha do arquivo."""
+
+    def __init__(self, tipo, simulacao):
+        self.tipo = tipo
+        self.simulacao = simulacao
+        self.lidas = 0
+        self.validas = 0
+        self.existentes = 0     # já estavam no banco (ou repetidas no arquivo, para caravanas): não são gravadas de novo
+        self.gravadas = 0
+        self.erros = []         # (linha do arquivo, mensagem)
+        self.totais = {}        # despesas: valor por categoria; caravanas: irmãos por mês; indicadores: linhas por indicador
+        self.segundos = 0.0
+
+    @property
+    def ok(self):
+        return not self.erros
+
+    def linhas_texto(self):
+        acao = "seriam gravadas" if self.simulacao else "gravadas"
+        linhas = [f"{self.tipo}: {self.lidas} linha(s) lidas, {self.validas} válidas, {self.existentes} já existentes, "
+                  f"{self.gravadas if not self.simulacao else self.validas - self.existentes} {acao}, {len(self.erros)} com erro ({self.segundos:.2f}s)"]
+        for chave, valor in sorted(self.totais.items()):
+            linhas.append(f"  {chave}: {valor:,.2f}" if isinstance(valor, float) else f"  {chave}: {valor}")
+        for linha, msg in self.erros[:MAX_ERROS_RELATORIO]: linhas.append(f"  linha {linha}: {msg}")
+        if len(self.erros) > MAX_ERROS_RELATORIO: linhas.append(f"  ... e mais {len(self.erros) - MAX_ERROS_RELATORIO} erro(s)")
+        return linhas
+
+
+class ErroImportacao(Exception):
+    """Arquivo que não pode ser importado (formato, cabeçalho ou tipo desconhecido)."""
+
+
+# --- NORMALIZAÇÃO DE VALORES ---
+def _chave(texto):
+    # "Organização (R$)" -> "organizacaor": comparação de cabeçalhos, categorias e meses
+    texto = unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]", "", texto.casefold())
+
+def _texto(valor):
+    return "" if valor is None else str(valor).strip()
+
+def _numero(valor, campo):
+    if isinstance(valor, bool): raise ValueError(f"{campo} inválido: {valor!r}")
+    if isinstance(valor, (int, float)): numero = float(valor)
+    else:
+        texto = _texto(valor).replace("R$", "").replace(" ", "").replace("\xa0", "")
+        if not texto: raise ValueError(f"{campo} vazio")
+        if "," in texto and "." in texto and texto.rfind(",") < texto.rfind("."): texto = texto.replace(",", "")  # 1,234.56
+        elif "," in texto: texto = texto.replace(".", "").replace(",", ".")  # 1.234,56
+        try: numero = float(texto)
+        except ValueError: raise ValueError(f"{campo} inválido: {valor!r}") from None
+    if not math.isfinite(numero): raise ValueError(f"{campo} inválido: {valor!r}")
+    return numero
+
+def _data(valor):
+    if isinstance(valor, datetime): return valor.date().isoformat()
+    if isinstance(valor, date): return valor.isoformat()
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool) and 20000 < valor < 80000:
+        from openpyxl.utils.datetime import from_excel  # célula de data sem formatação: número serial do Excel
+        return from_excel(valor).date().isoformat()
+    texto = _texto(valor)
+    if not texto: raise ValueError("data vazia")
+    for formato in ("%Y-%m-%d", "%d/%m/%Y", "%d/%m/%y", "%d-%m-%Y", "%d.%m.%Y", "%Y-%m-%d %H:%M:%S"):
+        try: return datetime.strptime(texto, formato).date().isoformat()
+        except ValueError: pass
+    raise ValueError(f"data inválida: {texto!r} (use DD/MM/AAAA ou AAAA-MM-DD)")
+
+def _sim_nao(valor):
+    chave = _chave(valor) if valor is not None else ""
+    if chave in SIM: return True
+    if chave in NAO: return False
+    raise ValueError(f"quitado inválido: {valor!r} (use sim/não)")
+
+# --- LEITURA EM BLOCOS ---
+def _linhas_xlsx(arquivo, aba=None):
+    import openpyxl  # tardio: só quem importa planilhas paga a importação
+    wb = openpyxl.load_workbook(arquivo, read_only=True, data_only=True)  # data_only: valor calculado das fórmulas
+    try:
+        if aba is not None and aba not in wb.sheetnames: raise ErroImportacao(f"aba não encontrada: {aba!r} (abas: {', '.join(wb.sheetnames)})")
+        yield from (wb[aba] if aba is not None else wb.active).iter_rows(values_only=True)
+    finally: wb.close()
+
+def _linhas_csv(arquivo):
+    # Codificação e separador detectados numa amostra do início (planilhas exportadas no Brasil costumam vir em cp1252 com ";")
+    amostra = arquivo.read(65536); arquivo.seek(0)
+    try: amostra.decode("utf-8-sig")
+    except UnicodeDecodeError as e: codificacao = "utf-8-sig" if e.start >= len(amostra) - 3 else "cp1252"
+    else: codificacao = "utf-8-sig"
+    texto = io.TextIOWrapper(arquivo, encoding=codificacao, newline="")
+    try:
+        try: dialeto = csv.Sniffer().sniff(amostra.decode(codificacao, errors="ignore"), delimiters=";,\t")
+        except csv.Error: dialeto = csv.excel
+        yield from csv.reader(texto, dialeto)
+    finally: texto.detach()  # não fecha o arquivo de quem chamou
+
+def ler_linhas(arquivo, nome, aba=None):
+    # (número da linha no arquivo, valores) de um .xlsx ou .csv; arquivo é um caminho ou um arquivo binário aberto
+    if isinstance(arquivo, (str, os.PathLike)):
+        with open(arquivo, "rb") as f: yield from ler_linhas(f, nome, aba)
+        return
+    if hasattr(arquivo, "seek"): arquivo.seek(0)
+    extensao = os.path.splitext(nome)[1].lower()
+    if extensao in (".xlsx", ".xlsm"): linhas = _linhas_xlsx(arquivo, aba)
+    elif extensao in (".csv", ".txt"): linhas = _linhas_csv(arquivo)
+    else: raise ErroImportacao(f"formato não suportado: {extensao or nome} (use .xlsx ou .csv)")
+    yield from enumerate(linhas, start=1)
+
+def _vazia(valores):
+    return all(v is None or (isinstance(v, str) and not v.strip()) for v in valores)
+
+def ler_registros(arquivo, nome, tipo, aba=None, tamanho_bloco=TAMANHO_BLOCO):
+    # Blocos de [(linha, {campo: valor})]; o cabeçalho é a primeira linha não vazia
+    linhas = ler_linhas(arquivo, nome, aba)
+    campos = None
+    bloco = []
+    for numero, valores in linhas:
+        if _vazia(valores): continue
+        if campos is None:
+            campos = _mapear_cabecalho(valores, tipo)
+            continue
+        bloco.append((numero, {campo: valores[i] if i < len(valores) else None for campo, i in campos.items()}))
+        if len(bloco) >= tamanho_bloco:
+            yield bloco; bloco = []
+    if campos is None: raise ErroImportacao("arquivo vazio: nenhuma linha de cabeçalho encontrada")
+    if bloco: yield bloco
+
+def _mapear_cabecalho(valores, tipo):
+    apelidos = {apelido: campo for campo, nomes in COLUNAS[tipo].items() for apelido in nomes}
+    campos = {}
+    for i, valor in enumerate(valores):
+        campo = apelidos.get(_chave(valor)) if valor is not None else None
+        if campo and campo not in campos: campos[campo] = i
+    faltando = [c for c in OBRIGATORIAS[tipo] if c not in campos]
+    if faltando:
+        raise ErroImportacao(f"coluna(s) obrigatória(s) ausente(s) para {tipo}: {', '.join(faltando)} "
+                             f"(cabeçalho lido: {', '.join(_texto(v) for v in valores if v is not None)})")
+    return campos
+
+# --- VALIDAÇÃO POR TIPO ---
+# Cada tipo tem: contexto (dados do banco usados na validação, lidos uma vez), conversão de uma linha em parâmetros
+# do INSERT/UPDATE (ValueError = linha inválida), chave de "já existe" e gravação de um bloco.
+def _contexto_despesas(pool):
+    categorias = {_chave(c): c for (c,) in pool.consultar("SELECT categoria FROM orcamentos_iniciais")}
+    for apelido, categoria in APELIDOS_CATEGORIA.items():
+        if _chave(categoria) in categorias: categorias.setdefault(apelido, categorias[_chave(categoria)])
+    return {"categorias": categorias}
+
+def _despesa(campos, ctx):
+    bruta = _texto(campos["categoria"])
+    categoria = ctx["categorias"].get(_chave(bruta))
+    if categoria is None: raise ValueError(f"categoria sem orçamento: {bruta!r} (cadastradas: {', '.join(sorted(set(ctx['categorias'].values())))})")
+    descricao = _texto(campos["descricao"])
+    if not descricao: raise ValueError("descrição vazia")
+    valor = round(_numero(campos["valor"], "valor"), 2)
+    if valor <= 0: raise ValueError(f"valor deve ser positivo: {valor}")
+    return (categoria, descricao, valor, _data(campos["data"]), _texto(campos.get("responsavel")))
+
+def _existentes_despesas(pool, ctx, linhas):
+    # Despesas já lançadas com a mesma categoria, descrição, valor e data (reimportar o mesmo arquivo não duplica)
+    datas = [p[3] for p in linhas]
+    return set(pool.consultar("SELECT categoria, descricao, ROUND(valor, 2), data_despesa FROM despesas WHERE data_despesa BETWEEN ? AND ?",
+                              (min(datas), max(datas))))
+
+def _gravar_despesas(conn, linhas):
+    conn.executemany("INSERT INTO despesas (categoria, descricao, valor, data_despesa, responsavel) VALUES (?, ?, ?, ?, ?)", linhas)
+
+def _contexto_caravanas(pool):
+    return {"meses": {_chave(m): m for m in banco.MESES_CARAVANA},
+            "existentes": {(_chave(n), m) for n, m in pool.consultar("SELECT nome_irmao, mes_caravana FROM financeiro_caravanas")}}
+
+def _caravana(campos, ctx):
+    nome = _texto(campos["nome"])
+    if not nome: raise ValueError("nome vazio")
+    mes = ctx["meses"].get(_chave(_texto(campos["mes"])))
+    if mes is None: raise ValueError(f"mês de caravana inválido: {_texto(campos['mes'])!r} (use {', '.join(banco.MESES_CARAVANA)})")
+    total = _numero(campos["valor_total"], "valor total")
+    pago = _numero(campos["valor_pago"], "valor pago") if _texto(campos.get("valor_pago")) else 0.0
+    if total < 0 or pago < 0: raise ValueError("valores não podem ser negativos")
+    quitado = _sim_nao(campos["quitado"]) if _texto(campos.get("quitado")) else pago >= total
+    return (nome, mes, pago, total, int(quitado))
+
+def _existentes_caravanas(pool, ctx, linhas):
+    return ctx["existentes"]
+
+def _gravar_caravanas(conn, linhas):
+    conn.executemany("INSERT INTO financeiro_caravanas (nome_irmao, mes_caravana, valor_pago, valor_total, quitado) VALUES (?, ?, ?, ?, ?)", linhas)
+
+def _contexto_indicadores(pool):
+    linhas = pool.consultar("SELECT id, indicador, meta FROM indicadores")
+    return {"indicadores": {_chave(nome): (id_ind, meta) for id_ind, nome, meta in linhas}, "nomes": {id_ind: nome for id_ind, nome, _ in linhas},
+            "hoje": date.today().isoformat()}
+
+def _indicador(campos, ctx):
+    # Sem data (ou com a data de hoje) atualiza o indicador; com data passada vira um ponto do histórico (historico_indicadores)
+    nome = _texto(campos["indicador"])
+    if _chave(nome) not in ctx["indicadores"]: raise ValueError(f"indicador não cadastrado: {nome!r}")
+    id_ind, meta_atual = ctx["indicadores"][_chave(nome)]
+    atual = _numero(campos["atual"], "atual")
+    meta = _numero(campos["meta"], "meta") if _texto(campos.get("meta")) else meta_atual
+    if atual != int(atual) or meta != int(meta): raise ValueError("atual e meta devem ser números inteiros")
+    dia = _data(campos["data"]) if _texto(campos.get("data")) else ctx["hoje"]
+    if dia > ctx["hoje"]: raise ValueError(f"data futura: {dia}")
+    return (id_ind, dia, int(atual), int(meta))
+
+def _existentes_indicadores(pool, ctx, linhas):
+    return set()
+
+def _gravar_indicadores(conn, linhas):
+    hoje = date.today().isoformat()
+    passado = [p for p in linhas if p[1] < hoje]
+    conn.executemany("INSERT INTO historico_indicadores (id_indicador, data, atual, meta) VALUES (?, ?, ?, ?) "
+                     "ON CONFLICT(id_indicador, data) DO UPDATE SET atual = excluded.atual, meta = excluded.meta", passado)
+    # O trigger de indicadores registra o ponto de hoje no histórico
+    conn.executemany("UPDATE indicadores SET atual = ?, meta = ? WHERE id = ?", [(a, m, i) for i, d, a, m in linhas if d >= hoje])
+
+# tipo -> (tabela, contexto, linha -> parâmetros, chave de "já existe", chaves já existentes, gravação, chave dos totais, valor dos totais)
+ESPECIFICACOES = {
+    "despesas": ("despesas", _contexto_despesas, _despesa, lambda p: p[:4], _existentes_despesas, _gravar_despesas, lambda p: p[0], lambda p: p[2]),
+    "caravanas": ("financeiro_caravanas", _contexto_caravanas, _caravana, lambda p: (_chave(p[0]), p[1]), _existentes_caravanas, _gravar_caravanas,
+                  lambda p: p[1], lambda p: 1),
+    "indicadores": ("indicadores", _contexto_indicadores, _indicador, None, _existentes_indicadores, _gravar_indicadores, lambda p: p[0], lambda p: 1),
+}
+
+# --- IMPORTAÇÃO ---
+@medido()
+def importar(arquivo, tipo, nome=None, simular=False, ignorar_invalidas=False, pular_existentes=True, aba=None, tamanho_bloco=TAMANHO_BLOCO):
+    # arquivo: caminho ou arquivo binário aberto (ex.: st.file_uploader); nome define o formato pela extensão.
+    # Devolve um RelatorioImportacao; problemas no arquivo como um todo levantam ErroImportacao.
+    if tipo not in ESPECIFICACOES: raise ErroImportacao(f"tipo desconhecido: {tipo!r} (use {', '.join(TIPOS)})")
+    nome = nome or getattr(arquivo, "name", None) or str(arquivo)
+    if not simular and not ignorar_invalidas:
+        # Um erro em qualquer linha impede a gravação: o arquivo é validado inteiro antes (sem guardar as linhas)
+        # e só então relido e gravado bloco a bloco
+        previa = _processar(arquivo, tipo, nome, False, pular_existentes, aba, tamanho_bloco)
+        if not previa.ok:
+            previa.simulacao = False
+            return previa
+    return _processar(arquivo, tipo, nome, not simular, pular_existentes, aba, tamanho_bloco)
+
+def _processar(arquivo, tipo, nome, gravar_blocos, pular_existentes, aba, tamanho_bloco):
+    # Lê, valida e (com gravar_blocos) grava cada bloco na sua própria transação assim que ele é validado: a memória fica
+    # em um bloco, o lock de escrita é segurado só durante o executemany do bloco, e um bloco que o banco recusa vira
+    # erro nas suas linhas sem desfazer os outros (reimportar o arquivo pula o que já foi gravado)
+    tabela, contexto, converter, chave, existentes, gravar, chave_total, valor_total = ESPECIFICACOES[tipo]
+    inicio = time.perf_counter()
+    pool = banco.obter_pool()
+    ctx = contexto(pool)
+    rel = RelatorioImportacao(tipo, not gravar_blocos)
+    for bloco in ler_registros(arquivo, nome, tipo, aba, tamanho_bloco):
+        rel.lidas += len(bloco)
+        validas = []
+        for numero, campos in bloco:
+            try: validas.append((numero, converter(campos, ctx)))
+            except ValueError as e: rel.erros.append((numero, str(e)))
+        if not validas: continue
+        rel.validas += len(validas)
+        ja_existem = existentes(pool, ctx, [p for _, p in validas]) if pular_existentes and chave else set()
+        a_gravar = []
+        for numero, params in validas:
+            if chave and chave(params) in ja_existem:
+                rel.existentes += 1; continue
+            if tipo == "caravanas": ja_existem.add(chave(params))  # o mesmo irmão duas vezes no mesmo mês
+            a_gravar.append((numero, params))
+            rel.totais[chave_total(params)] = rel.totais.get(chave_total(params), 0) + valor_total(params)
+        if not gravar_blocos or not a_gravar: continue
+        try:
+            with pool.transacao() as conn:
+                gravar(conn, [p for _, p in a_gravar])
+                banco.marcar_alteracao_externa(conn, tabela)  # outros processos (app) descartam o cache desta tabela
+            rel.gravadas += len(a_gravar)
+        except sqlite3.Error as e: rel.erros.extend((numero, f"não gravada: {e}") for numero, _ in a_gravar)
+    if rel.gravadas: pool.cache.invalidar(tabela)
+    if tipo == "indicadores": rel.totais = {ctx["nomes"][i]: q for i, q in rel.totais.items()}
+    if tipo == "despesas": rel.totais = {c: round(v, 2) for c, v in rel.totais.items()}
+    rel.segundos = time.perf_counter() - inicio
+    return rel
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa despesas, caravanas ou indicadores de uma planilha (.xlsx) ou CSV")
+    parser.add_argument("tipo", choices=TIPOS)
+    parser.add_argument("arquivo", help="planilha .xlsx ou arquivo .csv (cabeçalho na primeira linha)")
+    parser.add_argument("--banco", default=CAMINHO_BANCO, help="caminho do igreja.db")
+    parser.add_argument("--aba", default=None, help="aba da planilha (padrão: a aba ativa)")
+    parser.add_argument("--simular", action="store_true", help="só valida e mostra o relatório, sem gravar")
+    parser.add_argument("--ignorar-invalidas", action="store_true", help="grava as linhas válidas mesmo que outras tenham erro")
+    parser.add_argument("--incluir-existentes", action="store_true", help="grava também linhas iguais às que já estão no banco")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.banco): sys.exit(f"❌ Banco não encontrado: {args.banco}")
+    banco.configurar(args.banco, tamanho=1)
+    banco.init_db()
+    try: rel = importar(args.arquivo, args.tipo, simular=args.simular, ignorar_invalidas=args.ignorar_invalidas,
+                        pular_existentes=not args.incluir_existentes, aba=args.aba)
+    except (ErroImportacao, OSError) as e: sys.exit(f"❌ {e}")
+    for linha in rel.linhas_texto(): print(linha)
+    if rel.erros and not rel.gravadas and not args.simular and not args.ignorar_invalidas: print("❌ Nada foi gravado: corrija as linhas com erro ou use --ignorar-invalidas")
+    if rel.erros: sys.exit(1)
@@ -0,0 +1,102 @@
+from datetime import date, timedelta
+from html import escape
+import numpy as np
+import pandas as pd
+import banco
+from instrumentacao import medido
+
+# --- SÉRIES E TENDÊNCIAS DOS INDICADORES ---
+# O histórico (historico_indicadores, preenchido por trigger a cada alteração) vira uma matriz dia x indicador;
+# tendência (regressão linear), média móvel e previsão de alcance da meta saem de operações NumPy sobre todas as colunas de uma vez.
+# Tudo fica em cache até a próxima gravação em indicadores (que também é o que alimenta o histórico).
+JANELA_TENDENCIA_DIAS = 90
+JANELA_MEDIA_DIAS = 30
+HISTORICO_PADRAO_DIAS = 365
+
+def _em_cache(chave, gerar):
+    # A data entra na chave: as séries são estendidas até hoje
+    return banco.obter_pool().cache.obter(("indicadores",) + chave + (date.today().isoformat(),), ("indicadores",), gerar)
+
+def historico(dias=HISTORICO_PADRAO_DIAS):
+    # Formato longo: id_indicador, data, atual, meta (o ponto anterior à janela é incluído para a série começar com valor)
+    desde = (date.today() - timedelta(days=dias)).isoformat()
+    sql = """SELECT h.id_indicador, h.data, h.atual, h.meta FROM historico_indicadores h WHERE h.data >= ?
+             UNION ALL
+             SELECT h.id_indicador, MAX(h.data), h.atual, h.meta FROM historico_indicadores h WHERE h.data < ? GROUP BY h.id_indicador"""
+    return _em_cache(("historico", dias), lambda: banco.obter_pool().consultar_df(sql, (desde, desde))).copy(deep=False)
+
+def matriz_diaria(df_hist, dias=HISTORICO_PADRAO_DIAS):
+    # Dia x indicador com o último valor conhecido propagado (o indicador vale o que foi gravado até a próxima alteração)
+    fim = pd.Timestamp(date.today())
+    indice = pd.date_range(fim - pd.Timedelta(days=dias), fim, freq="D")
+    if df_hist.empty: return pd.DataFrame(index=indice, dtype=float)
+    largo = df_hist.assign(data=pd.to_datetime(df_hist['data'])).pivot_table(index='data', columns='id_indicador', values='atual', aggfunc='last')
+    return largo.reindex(largo.index.union(indice)).ffill().reindex(indice).astype(float)
+
+def _inclinacao(matriz):
+    # Mínimos quadrados por coluna ignorando NaN: inclinação em unidades por dia, calculada para todas as colunas juntas
+    y = matriz.to_numpy()
+    validos = ~np.isnan(y)
+    x = np.arange(len(y), dtype=float)[:, None] * validos
+    y = np.where(validos, y, 0.0)
+    n = validos.sum(axis=0)
+    sx, sy, sxx, sxy = x.sum(axis=0), y.sum(axis=0), (x * x).sum(axis=0), (x * y).sum(axis=0)
+    denom = n * sxx - sx * sx
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return pd.Series(np.where(denom > 0, (n * sxy - sx * sy) / denom, 0.0), index=matriz.columns)
+
+@medido()
+def tendencias(janela=JANELA_TENDENCIA_DIAS, janela_media=JANELA_MEDIA_DIAS):
+    return _em_cache(("tendencias", janela, janela_media), lambda: _calcular_tendencias(janela, janela_media)).copy(deep=False)
+
+def _calcular_tendencias(janela, janela_media):
+    df = banco.ler_dados("indicadores", "id ASC")
+    if df.empty: return df
+    matriz = matriz_diaria(historico(janela), janela).reindex(columns=df['id'])
+    inclinacao = _inclinacao(matriz).to_numpy()
+    media = matriz.iloc[-janela_media:].mean().to_numpy()
+    atual, meta = df['atual'].to_numpy(dtype=float), df['meta'].to_numpy(dtype=float)
+    falta = meta - atual
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dias = np.where(falta <= 0, 0.0, np.where(inclinacao > 0, np.ceil(falta / inclinacao), np.nan))
+        pct = np.where(meta > 0, atual / meta * 100, 100.0)
+    hoje = pd.Timestamp(date.today())
+    return df.assign(pct=pct, tendencia_mes=inclinacao * 30, media_movel=media, dias_para_meta=dias,
+                     previsao_meta=(hoje + pd.to_timedelta(dias, unit="D")).strftime("%Y-%m-%d").where(~np.isnan(dias), None))
+
+def cards_html(df):
+    # Todos os cartões numa grade única (um st.markdown), montados coluna a coluna
+    if df.empty: return ""
+    classe = np.select([df['atual'] >= df['meta'], df['pct'] >= 70], ["txt-green", "txt-yellow"], "txt-red")
+    seta = np.select([df['tendencia_mes'] > 0.05, df['tendencia_mes'] < -0.05], ["▲", "▼"], "■")
+    previsao = np.where(df['atual'] >= df['meta'], "meta atingida",
+                        np.where(df['previsao_meta'].notna(), "meta em " + df['previsao_meta'].fillna(""), "sem previsão"))
+    cards = ("<div class='ind-card'><div class='ind-title'>" + df['indicador'].map(escape) + "</div><div class='ind-value " + classe + "'>"
+             + df['atual'].astype(str) + "</div><div class='ind-meta'>Meta: " + df['meta'].astype(str) + "</div><div class='ind-meta'>"
+             + seta + " " + df['tendencia_mes'].map("{:+.1f}/mês".format) + " · " + previsao + "</div></div>")
+    return "<div class='ind-grid'>" + "".join(cards) + "</div>"
+
+# --- GRÁFICOS EM CACHE (o mesmo objeto é reaproveitado entre reruns e sessões até a próxima alteração) ---
+def figura_atual_meta():
+    def gerar():
+        import plotly.graph_objects as go
+        df = banco.ler_dados("indicadores", "id ASC")
+        return go.Figure(data=[go.Bar(name='Atual', x=df['indicador'], y=df['atual'], marker_color='#1e3a8a'),
+                               go.Bar(name='Meta', x=df['indicador'], y=df['meta'], marker_color='#93c5fd')])
+    return _em_cache(("fig_atual_meta",), gerar)
+
+def figura_historico(dias=HISTORICO_PADRAO_DIAS, janela_media=JANELA_MEDIA_DIAS):
+    def gerar():
+        import plotly.graph_objects as go
+        df = banco.ler_dados("indicadores", "id ASC")
+        matriz = matriz_diaria(historico(dias), dias).reindex(columns=df['id'])
+        # Percentual da meta: indicadores de escalas diferentes no mesmo gráfico
+        metas = df.set_index('id')['meta'].where(lambda m: m > 0)
+        pct = matriz.div(metas, axis=1) * 100
+        media = pct.rolling(janela_media, min_periods=1).mean()
+        fig = go.Figure()
+        for id_ind, nome in zip(df['id'], df['indicador']):
+            fig.add_trace(go.Scatter(x=media.index, y=media[id_ind], name=nome, mode='lines'))
+        fig.update_layout(height=420, yaxis_title=f"% da meta (média móvel {janela_media} dias)", hovermode="x unified")
+        return fig
+    return _em_cache(("fig_historico", dias, janela_media), gerar)
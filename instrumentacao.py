@@ -0,0 +1,159 @@
+import os
+import time
+import atexit
+import logging
+import threading
+import functools
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import pandas as pd
+
+# --- INSTRUMENTAÇÃO DE DESEMPENHO ---
+# Cada rerun do app abre um contexto (rerun(pagina)) na thread do script; dentro dele as funções marcadas com @medido
+# e os blocos "with medir(...)" acumulam tempos, e o pool de conexões soma consultas e linhas lidas.
+# No fim do rerun as medições vão para um buffer em memória por banco, gravado em metricas_desempenho num lote só a cada
+# GRAVAR_A_CADA_RERUNS reruns ou GRAVAR_A_CADA_SEGUNDOS (e ao ler as métricas ou sair do processo): uma visita à página
+# não disputa o lock de escrita do banco da ala com as edições e o agendador. Chamadas fora de um rerun (ex.: downloads,
+# que o Streamlit executa em outra thread) só são gravadas avulsas, com a página FORA_DE_RERUN, se AVULSAS estiver ligado
+# (o app liga; o agendador e os scripts não, para não gravar uma linha a cada chamada).
+# Desligue tudo com a variável de ambiente PORTAL_INSTRUMENTACAO=0.
+ATIVA = os.environ.get("PORTAL_INSTRUMENTACAO", "1") != "0"
+AVULSAS = False
+FORA_DE_RERUN = "(fora de rerun)"
+RETENCAO_DIAS = 14
+GRAVAR_A_CADA_RERUNS = 20
+GRAVAR_A_CADA_SEGUNDOS = 60
+PODAR_A_CADA = 20  # lotes gravados entre podas das métricas antigas
+FORMATO_DATA = "%Y-%m-%d %H:%M:%S"
+
+_log = logging.getLogger(__name__)
+_local = threading.local()
+_lock = threading.Lock()
+_gravacoes = 0
+_pendentes = {}  # pool -> [reruns ainda não gravados, instante da última gravação, linhas]
+
+
+class _Contexto:
+    """Medições acumuladas durante um rerun (ou uma chamada avulsa)."""
+
+    def __init__(self, pagina):
+        self.pagina = pagina
+        self.medicoes = []  # (funcao, duracao_ms, consultas, linhas)
+        self.consultas = 0
+        self.linhas = 0
+
+
+def _contexto():
+    return getattr(_local, "contexto", None)
+
+def contar_consulta(linhas=0):
+    # Chamado pelo pool a cada SELECT; sem contexto aberto não há a quem atribuir
+    ctx = _contexto()
+    if ctx is not None:
+        ctx.consultas += 1; ctx.linhas += linhas
+
+@contextmanager
+def medir(nome):
+    ctx = _contexto()
+    avulso = ctx is None
+    if not ATIVA or (avulso and not AVULSAS):
+        yield; return
+    if avulso: ctx = _local.contexto = _Contexto(FORA_DE_RERUN)
+    consultas, linhas = ctx.consultas, ctx.linhas
+    inicio = time.perf_counter()
+    try: yield
+    finally:
+        ctx.medicoes.append((nome, (time.perf_counter() - inicio) * 1000, ctx.consultas - consultas, ctx.linhas - linhas))
+        if avulso:
+            _local.contexto = None
+            _gravar(ctx)
+
+def medido(nome=None):
+    # Decorador: @medido() usa "modulo.funcao" como nome
+    def decorar(funcao):
+        rotulo = nome or f"{funcao.__module__}.{funcao.__name__}"
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            with medir(rotulo): return funcao(*args, **kwargs)
+        return envolvida
+    return decorar
+
+@contextmanager
+def rerun(pagina):
+    # Envolve um rerun inteiro; st.rerun()/st.stop() (exceções de controle do Streamlit) também fecham o contexto.
+    # Aninhado num rerun já aberto (seção/fragmento executado dentro da página) vira só mais uma medição dele;
+    # sozinho (rerun parcial de um fragmento) é gravado como um rerun da seção.
+    if not ATIVA:
+        yield; return
+    if _contexto() is not None:
+        with medir(f"(seção) {pagina}"): yield
+        return
+    ctx = _local.contexto = _Contexto(pagina)
+    inicio = time.perf_counter()
+    try: yield
+    finally:
+        ctx.medicoes.append(("(rerun)", (time.perf_counter() - inicio) * 1000, ctx.consultas, ctx.linhas))
+        _local.contexto = None
+        _gravar(ctx)
+
+# --- PERSISTÊNCIA ---
+def _gravar(ctx):
+    # Só acumula; grava o lote do banco quando ele junta reruns suficientes ou fica velho demais
+    import banco  # tardio: banco importa este módulo
+    if not ctx.medicoes: return
+    try: pool = banco.obter_pool()
+    except RuntimeError: return
+    registrado = datetime.now().strftime(FORMATO_DATA)
+    with _lock:
+        pendente = _pendentes.setdefault(pool, [0, time.monotonic(), []])
+        pendente[0] += 1
+        pendente[2].extend((registrado, ctx.pagina, f, d, q, l) for f, d, q, l in ctx.medicoes)
+        cheio = pendente[0] >= GRAVAR_A_CADA_RERUNS or time.monotonic() - pendente[1] >= GRAVAR_A_CADA_SEGUNDOS
+    if cheio: descarregar(pool)
+
+def descarregar(pool=None):
+    # Grava as medições pendentes do pool (todas, sem pool) numa transação por banco
+    global _gravacoes
+    with _lock:
+        pools = [pool] if pool is not None else list(_pendentes)
+        lotes = []
+        for p in pools:
+            pendente = _pendentes.get(p)
+            if pendente is None: continue
+            if pendente[2]: lotes.append((p, pendente[2]))
+            _pendentes[p] = [0, time.monotonic(), []]
+    for p, linhas in lotes:
+        try:
+            with p.transacao() as c:
+                c.executemany("INSERT INTO metricas_desempenho (registrado_em, pagina, funcao, duracao_ms, consultas, linhas) VALUES (?, ?, ?, ?, ?, ?)", linhas)
+                with _lock:
+                    _gravacoes += 1
+                    podar = _gravacoes % PODAR_A_CADA == 1
+                if podar: c.execute("DELETE FROM metricas_desempenho WHERE registrado_em < ?", ((datetime.now() - timedelta(days=RETENCAO_DIAS)).strftime(FORMATO_DATA),))
+        except Exception:
+            # medir nunca pode derrubar a página: o lote é descartado
+            _log.warning("Falha ao gravar %d métrica(s) de desempenho em %s", len(linhas), p.caminho, exc_info=True)
+
+atexit.register(descarregar)
+
+def ler_metricas(dias=7):
+    import banco
+    descarregar(banco.obter_pool())
+    desde = (datetime.now() - timedelta(days=dias)).strftime(FORMATO_DATA)
+    with banco.obter_pool().conexao() as conn:
+        return pd.read_sql_query("SELECT registrado_em, pagina, funcao, duracao_ms, consultas, linhas FROM metricas_desempenho WHERE registrado_em >= ?", conn, params=(desde,))
+
+def resumo(df, por):
+    # p50/p95 por grupo (ex.: por=["pagina"] ou ["funcao"]), mais consultas e linhas médias
+    if df.empty: return df
+    g = df.groupby(por)
+    out = g['duracao_ms'].agg(chamadas='count', p50=lambda s: s.quantile(0.5), p95=lambda s: s.quantile(0.95), max='max')
+    out['consultas_media'] = g['consultas'].mean()
+    out['linhas_media'] = g['linhas'].mean()
+    return out.reset_index().sort_values('p95', ascending=False)
+
+def limpar_metricas():
+    import banco
+    pool = banco.obter_pool()
+    with _lock: _pendentes.pop(pool, None)
+    pool.executar("DELETE FROM metricas_desempenho")
@@ -0,0 +1,108 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+# --- MEDIÇÃO DE INICIALIZAÇÃO E RERUNS ---
+# Roda o app.py headless (streamlit.testing.AppTest) numa pasta temporária e mede:
+#   - importação dos módulos do app num processo Python novo (frio);
+#   - primeiro run do script num processo novo (frio: migrações, caches vazios) e reruns de cada página (quente).
+# Os módulos pesados carregados são sempre conferidos num processo filho: neste processo o Streamlit (e quem chamou,
+# p.ex. o benchmark) já pode ter importado alguns deles, e a conferência não provaria nada.
+# Uso: python medir_inicio.py [--repeticoes 5] [--limite-frio 8] [--saida resultado.json]
+PASTA_APP = os.path.dirname(os.path.abspath(__file__))
+PAGINAS = {
+    "📢 Mural de Avisos": None,
+    "📅 Calendário da Ala": None,
+    "🔒 Líderes e Secretários": ("pwd_lideranca", "admin123"),
+    "🏢 Painel do Bispado": ("pwd_bispado", "bispo2026"),
+}
+MODULOS_PESADOS = ("plotly.express", "plotly.graph_objects", "fpdf", "xlsxwriter", "PIL", "openpyxl")
+# Módulos do projeto que o app.py importa no topo (os de interface ficam de fora: exigem o Streamlit)
+MODULOS_APP = ("banco", "alas", "instrumentacao", "importacao", "recorrencias", "conflitos", "backup", "imagens", "indicadores", "calendario")
+
+def _json_do_filho(argumentos, cwd):
+    saida = subprocess.run([sys.executable] + argumentos, cwd=cwd, capture_output=True, text=True, check=True).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+def medir_importacao():
+    # Processo separado para não herdar módulos já importados por este script
+    codigo = ("import sys, time, json; t = time.perf_counter(); import %s; "
+              "print(json.dumps({'segundos': time.perf_counter() - t, 'pesados': sorted(m for m in %r if m in sys.modules)}))" % (", ".join(MODULOS_APP), MODULOS_PESADOS))
+    return _json_do_filho(["-c", codigo], PASTA_APP)
+
+def _primeiro_run_filho():
+    # Roda no processo filho, na pasta do teste: separa os pesados que o próprio Streamlit já trouxe dos que o app importou
+    from streamlit.testing.v1 import AppTest
+    antes = set(sys.modules)
+    at = AppTest.from_file(os.path.join(PASTA_APP, "app.py"), default_timeout=120)
+    t = time.perf_counter(); at.run()
+    print(json.dumps({"segundos": time.perf_counter() - t, "erros": [str(e.value) for e in at.exception],
+                      "pesados": sorted(m for m in MODULOS_PESADOS if m in sys.modules and m not in antes),
+                      "pesados_do_streamlit": sorted(m for m in MODULOS_PESADOS if m in antes)}))
+
+def medir_primeiro_run(pasta):
+    return _json_do_filho([os.path.abspath(__file__), "--primeiro-run-filho"], pasta)
+
+def _abrir_pagina(at, pagina):
+    at.sidebar.radio[0].set_value(pagina).run()
+    senha = PAGINAS[pagina]
+    if senha: at.sidebar.text_input(key=senha[0]).set_value(senha[1]).run()
+
+def medir_app(repeticoes, banco_origem=None):
+    # banco_origem: igreja.db usado como ponto de partida (ex.: banco sintético do pacote benchmark); sem ele o app cria um vazio
+    from streamlit.testing.v1 import AppTest
+    resultado = {}
+    pasta = tempfile.mkdtemp(prefix="medir_app_")
+    origem = os.getcwd()
+    try:
+        os.chdir(pasta)
+        if os.path.exists(os.path.join(PASTA_APP, "logo.png")): shutil.copy(os.path.join(PASTA_APP, "logo.png"), pasta)
+        if banco_origem: shutil.copy(banco_origem, os.path.join(pasta, "igreja.db"))
+        frio = medir_primeiro_run(pasta)
+        resultado["primeiro_run"] = frio["segundos"]
+        resultado["pesados_apos_mural"] = frio["pesados"]
+        resultado["pesados_do_streamlit"] = frio["pesados_do_streamlit"]
+        at = AppTest.from_file(os.path.join(PASTA_APP, "app.py"), default_timeout=120)
+        at.run()
+        resultado["paginas"] = {}
+        for pagina in PAGINAS:
+            _abrir_pagina(at, pagina)
+            tempos = []
+            for _ in range(repeticoes):
+                t = time.perf_counter(); at.run(); tempos.append(time.perf_counter() - t)
+            erros = [str(e.value) for e in at.exception]
+            resultado["paginas"][pagina] = {"mediana": statistics.median(tempos), "max": max(tempos), "erros": erros}
+    finally:
+        os.chdir(origem)
+        shutil.rmtree(pasta, ignore_errors=True)
+    return resultado
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede o tempo de inicialização e de rerun das páginas do app")
+    parser.add_argument("--repeticoes", type=int, default=5, help="reruns medidos por página")
+    parser.add_argument("--limite-frio", type=float, default=None, help="falha (código 1) se o primeiro run passar deste tempo em segundos")
+    parser.add_argument("--saida", help="grava o resultado em JSON neste arquivo")
+    parser.add_argument("--primeiro-run-filho", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    sys.path.insert(0, PASTA_APP)
+    if args.primeiro_run_filho: _primeiro_run_filho(); return
+
+    resultado = {"importacao": medir_importacao(), **medir_app(args.repeticoes)}
+    print(f"Importação dos módulos do app: {resultado['importacao']['segundos']:.3f}s (pesados carregados: {resultado['importacao']['pesados'] or 'nenhum'})")
+    print(f"Primeiro run (frio, Mural): {resultado['primeiro_run']:.3f}s (pesados carregados pelo app: {resultado['pesados_apos_mural'] or 'nenhum'}; "
+          f"já trazidos pelo Streamlit: {resultado['pesados_do_streamlit'] or 'nenhum'})")
+    for pagina, m in resultado["paginas"].items():
+        print(f"  {pagina:<28} rerun mediana {m['mediana'] * 1000:7.1f} ms  máx {m['max'] * 1000:7.1f} ms" + (f"  ERROS: {m['erros']}" if m["erros"] else ""))
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f: json.dump(resultado, f, ensure_ascii=False, indent=2)
+    if args.limite_frio is not None and resultado["primeiro_run"] > args.limite_frio:
+        print(f"❌ Primeiro run acima do limite de {args.limite_frio}s"); sys.exit(1)
+
+if __name__ == "__main__":
+    main()
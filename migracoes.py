@@ -0,0 +1,175 @@
+from datetime import datetime
+
+# --- MIGRAÇÕES VERSIONADAS DO ESQUEMA ---
+# Cada passo roda uma única vez, em ordem, dentro da sua própria transação.
+# Para evoluir o banco: acrescente uma nova função ao final de MIGRACOES (nunca altere um passo já publicado).
+
+def _m001_esquema_inicial(c):
+    # Tabelas Core
+    c.execute('CREATE TABLE IF NOT EXISTS comunicados (id INTEGER PRIMARY KEY AUTOINCREMENT, data_postagem TEXT, titulo TEXT, mensagem TEXT, autor TEXT, link TEXT, imagem TEXT)')
+    c.execute('CREATE TABLE IF NOT EXISTS agenda (id INTEGER PRIMARY KEY AUTOINCREMENT, data_evento TEXT, titulo TEXT, descricao TEXT, local TEXT)')
+    c.execute('CREATE TABLE IF NOT EXISTS tarefas_bispado (id INTEGER PRIMARY KEY AUTOINCREMENT, data_criacao TEXT, tarefa TEXT, status TEXT, prioridade TEXT, responsavel TEXT)')
+    c.execute('CREATE TABLE IF NOT EXISTS agenda_bispado (id INTEGER PRIMARY KEY AUTOINCREMENT, data_agenda TEXT, horario TEXT, nome_compromisso TEXT, status TEXT)')
+    c.execute('CREATE TABLE IF NOT EXISTS planejamento_lideranca (id INTEGER PRIMARY KEY AUTOINCREMENT, organizacao TEXT, atividade TEXT, data_planejada TEXT, horario_inicio TEXT, horario_fim TEXT)')
+    c.execute('CREATE TABLE IF NOT EXISTS indicadores (id INTEGER PRIMARY KEY AUTOINCREMENT, categoria TEXT, indicador TEXT, atual INTEGER, meta INTEGER)')
+    # Tabelas Financeiras
+    c.execute('CREATE TABLE IF NOT EXISTS financeiro_caravanas (id INTEGER PRIMARY KEY AUTOINCREMENT, nome_irmao TEXT, mes_caravana TEXT, valor_pago REAL, valor_total REAL, quitado INTEGER)')
+    c.execute('CREATE TABLE IF NOT EXISTS orcamentos_iniciais (id INTEGER PRIMARY KEY AUTOINCREMENT, categoria TEXT UNIQUE, valor_inicial REAL)')
+    c.execute('CREATE TABLE IF NOT EXISTS despesas (id INTEGER PRIMARY KEY AUTOINCREMENT, categoria TEXT, descricao TEXT, valor REAL, data_despesa TEXT, responsavel TEXT)')
+
+    # Seeding Inicial
+    if c.execute('SELECT count(*) FROM indicadores').fetchone()[0] == 0:
+        dados_iniciais = [("VIVER", "Frequência Sacramental", 109, 110), ("VIVER", "Membros Participantes", 102, 115), ("CUIDAR NECESSITADOS", "Membros Retornando", 0, 10), ("CUIDAR NECESSITADOS", "Membros Jejuando", 20, 34), ("CONVIDAR TODOS", "Batismos", 4, 20), ("CONVIDAR TODOS", "Missionários", 1, 2), ("UNIR FAMÍLIAS", "Membros com Investidura", 49, 50), ("UNIR FAMÍLIAS", "Membros sem Investidura", 26, 30)]
+        c.executemany('INSERT INTO indicadores (categoria, indicador, atual, meta) VALUES (?,?,?,?)', dados_iniciais)
+
+    if c.execute('SELECT count(*) FROM orcamentos_iniciais').fetchone()[0] == 0:
+        orc_iniciais = [("Administração", 1000.0), ("Primária", 600.0), ("Moças", 500.0), ("Rapazes", 500.0), ("Soc. Socorro", 350.0), ("Seminário", 300.0), ("Obra Missionária", 300.0), ("JAS", 250.0), ("Quórum", 200.0)]
+        c.executemany('INSERT OR IGNORE INTO orcamentos_iniciais (categoria, valor_inicial) VALUES (?,?)', orc_iniciais)
+
+def _m002_datas_iso(c):
+    # Datas ficam como TEXT ISO-8601 (AAAA-MM-DD), que ordena e compara corretamente como texto.
+    # Converte registros antigos em DD/MM/AAAA e remove a parte de hora gravada por engano.
+    colunas = [("comunicados", "data_postagem"), ("tarefas_bispado", "data_criacao"), ("agenda_bispado", "data_agenda"),
+               ("planejamento_lideranca", "data_planejada"), ("despesas", "data_despesa"), ("agenda", "data_evento")]
+    for tabela, col in colunas:
+        c.execute(f"UPDATE {tabela} SET {col} = substr({col}, 7, 4) || '-' || substr({col}, 4, 2) || '-' || substr({col}, 1, 2) "
+                  f"WHERE {col} GLOB '[0-9][0-9]/[0-9][0-9]/[0-9][0-9][0-9][0-9]'")
+        c.execute(f"UPDATE {tabela} SET {col} = substr({col}, 1, 10) "
+                  f"WHERE {col} GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9][ T]*'")
+    # Horários no formato HH:MM (sem segundos) para ordenar junto com a data
+    for tabela, col in [("agenda_bispado", "horario"), ("planejamento_lideranca", "horario_inicio"), ("planejamento_lideranca", "horario_fim")]:
+        c.execute(f"UPDATE {tabela} SET {col} = substr({col}, 1, 5) WHERE {col} GLOB '[0-9][0-9]:[0-9][0-9]:[0-9][0-9]*'")
+
+def _m003_indices(c):
+    # Índices das consultas quentes (filtros e ordenações das abas)
+    c.execute('CREATE INDEX IF NOT EXISTS idx_planejamento_data ON planejamento_lideranca (data_planejada, horario_inicio)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_agenda_bispado_data ON agenda_bispado (data_agenda, horario)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_caravanas_mes ON financeiro_caravanas (mes_caravana)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_despesas_categoria ON despesas (categoria, valor)')  # cobre o SUM por categoria
+    c.execute('CREATE INDEX IF NOT EXISTS idx_despesas_data ON despesas (data_despesa)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_tarefas_status ON tarefas_bispado (status)')
+
+def _m004_fila_mensagens(c):
+    # Fila persistente de mensagens do agendador (outbox): cada mensagem tem uma chave de idempotência única
+    c.execute('''CREATE TABLE IF NOT EXISTS fila_mensagens (id INTEGER PRIMARY KEY AUTOINCREMENT, chave TEXT UNIQUE NOT NULL, tipo_destino TEXT NOT NULL,
+                 destino TEXT NOT NULL, nome_destino TEXT, texto TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'pendente', tentativas INTEGER NOT NULL DEFAULT 0,
+                 proxima_tentativa TEXT, ultimo_erro TEXT, criado_em TEXT, enviado_em TEXT)''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_fila_status ON fila_mensagens (status, proxima_tentativa)')
+
+def _m005_log_alteracoes(c):
+    # Feed de alterações mantido por triggers: consumidores (ex.: agendador) leem só o que mudou desde a sua marca
+    c.execute('CREATE TABLE IF NOT EXISTS log_alteracoes (seq INTEGER PRIMARY KEY AUTOINCREMENT, tabela TEXT NOT NULL, id_registro INTEGER NOT NULL, operacao TEXT NOT NULL, alterado_em TEXT)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_log_tabela_seq ON log_alteracoes (tabela, seq)')
+    c.execute('CREATE TABLE IF NOT EXISTS marcas_consumidor (consumidor TEXT PRIMARY KEY, ultima_seq INTEGER NOT NULL, atualizado_em TEXT)')
+    for tabela in ("comunicados", "tarefas_bispado"):
+        for evento, op, ref in (("INSERT", "I", "NEW"), ("UPDATE", "U", "NEW"), ("DELETE", "D", "OLD")):
+            c.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_{tabela}_{op.lower()} AFTER {evento} ON {tabela} BEGIN
+                          INSERT INTO log_alteracoes (tabela, id_registro, operacao, alterado_em) VALUES ('{tabela}', {ref}.id, '{op}', datetime('now', 'localtime'));
+                          END""")
+
+def _m006_metricas_desempenho(c):
+    # Tempos gravados pela instrumentação (instrumentacao.py) para o painel de desempenho
+    c.execute('CREATE TABLE IF NOT EXISTS metricas_desempenho (id INTEGER PRIMARY KEY AUTOINCREMENT, registrado_em TEXT NOT NULL, pagina TEXT, funcao TEXT NOT NULL, duracao_ms REAL NOT NULL, consultas INTEGER, linhas INTEGER)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_metricas_data ON metricas_desempenho (registrado_em)')
+
+def _m007_razao_orcamento(c):
+    # Razão materializado das despesas: total por categoria e por categoria/mês (AAAA-MM), mantidos por triggers
+    # para que qualquer escrita (app, importação, outro processo) atualize os saldos sem reler a tabela inteira
+    c.execute('CREATE TABLE IF NOT EXISTS razao_categoria (categoria TEXT PRIMARY KEY, gasto REAL NOT NULL, quantidade INTEGER NOT NULL) WITHOUT ROWID')
+    c.execute('CREATE TABLE IF NOT EXISTS razao_mensal (categoria TEXT NOT NULL, mes TEXT NOT NULL, gasto REAL NOT NULL, quantidade INTEGER NOT NULL, PRIMARY KEY (mes, categoria)) WITHOUT ROWID')
+    c.execute('DELETE FROM razao_categoria'); c.execute('DELETE FROM razao_mensal')
+    c.execute("INSERT INTO razao_categoria SELECT COALESCE(categoria, ''), ROUND(SUM(COALESCE(valor, 0)), 2), count(*) FROM despesas GROUP BY 1")
+    c.execute("INSERT INTO razao_mensal SELECT COALESCE(categoria, ''), COALESCE(substr(data_despesa, 1, 7), ''), ROUND(SUM(COALESCE(valor, 0)), 2), count(*) FROM despesas GROUP BY 1, 2")
+    somar = """INSERT INTO razao_categoria VALUES (COALESCE(NEW.categoria, ''), ROUND(COALESCE(NEW.valor, 0), 2), 1)
+                   ON CONFLICT(categoria) DO UPDATE SET gasto = ROUND(gasto + excluded.gasto, 2), quantidade = quantidade + 1;
+               INSERT INTO razao_mensal VALUES (COALESCE(NEW.categoria, ''), COALESCE(substr(NEW.data_despesa, 1, 7), ''), ROUND(COALESCE(NEW.valor, 0), 2), 1)
+                   ON CONFLICT(mes, categoria) DO UPDATE SET gasto = ROUND(gasto + excluded.gasto, 2), quantidade = quantidade + 1;"""
+    subtrair = """UPDATE razao_categoria SET gasto = ROUND(gasto - COALESCE(OLD.valor, 0), 2), quantidade = quantidade - 1 WHERE categoria = COALESCE(OLD.categoria, '');
+                  UPDATE razao_mensal SET gasto = ROUND(gasto - COALESCE(OLD.valor, 0), 2), quantidade = quantidade - 1
+                      WHERE mes = COALESCE(substr(OLD.data_despesa, 1, 7), '') AND categoria = COALESCE(OLD.categoria, '');
+                  DELETE FROM razao_categoria WHERE quantidade <= 0;
+                  DELETE FROM razao_mensal WHERE quantidade <= 0;"""
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_despesas_razao_i AFTER INSERT ON despesas BEGIN {somar} END")
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_despesas_razao_d AFTER DELETE ON despesas BEGIN {subtrair} END")
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_despesas_razao_u AFTER UPDATE OF categoria, valor, data_despesa ON despesas BEGIN {subtrair} {somar} END")
+
+def _m008_historico_indicadores(c):
+    # Série histórica dos indicadores: só acrescenta, no máximo uma linha por indicador por dia (a última gravação do dia vale).
+    # Chave (id_indicador, data) sem rowid: cada ponto ocupa poucos bytes e a leitura por período segue a ordem da chave.
+    c.execute('CREATE TABLE IF NOT EXISTS historico_indicadores (id_indicador INTEGER NOT NULL, data TEXT NOT NULL, atual INTEGER, meta INTEGER, PRIMARY KEY (id_indicador, data)) WITHOUT ROWID')
+    c.execute("INSERT OR IGNORE INTO historico_indicadores SELECT id, date('now', 'localtime'), atual, meta FROM indicadores")
+    registrar = """INSERT INTO historico_indicadores VALUES (NEW.id, date('now', 'localtime'), NEW.atual, NEW.meta)
+                   ON CONFLICT(id_indicador, data) DO UPDATE SET atual = excluded.atual, meta = excluded.meta;"""
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_indicadores_hist_i AFTER INSERT ON indicadores BEGIN {registrar} END")
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_indicadores_hist_u AFTER UPDATE OF atual, meta ON indicadores BEGIN {registrar} END")
+
+# Fontes da busca: código (entra no rowid do índice), tabela, título, corpo e data de cada registro
+FONTES_BUSCA = [
+    (0, "comunicados", "titulo", "COALESCE({r}.mensagem, '') || ' ' || COALESCE({r}.autor, '')", "data_postagem"),
+    (1, "tarefas_bispado", "tarefa", "COALESCE({r}.responsavel, '') || ' ' || COALESCE({r}.prioridade, '') || ' ' || COALESCE({r}.status, '')", "data_criacao"),
+    (2, "agenda_bispado", "nome_compromisso", "COALESCE({r}.status, '')", "data_agenda"),
+    (3, "planejamento_lideranca", "atividade", "COALESCE({r}.organizacao, '')", "data_planejada"),
+]
+
+def _m009_busca_textual(c):
+    # Índice FTS5 único para as quatro tabelas; rowid = id * 4 + código da tabela, para que os triggers
+    # apaguem/atualizem a entrada de um registro pela chave, sem varrer o índice
+    c.execute("CREATE VIRTUAL TABLE IF NOT EXISTS busca USING fts5(tabela UNINDEXED, id_registro UNINDEXED, titulo, corpo, data UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')")
+    c.execute("DELETE FROM busca")
+    for codigo, tabela, titulo, corpo, data in FONTES_BUSCA:
+        c.execute(f"INSERT INTO busca (rowid, tabela, id_registro, titulo, corpo, data) SELECT id * 4 + {codigo}, '{tabela}', id, COALESCE({titulo}, ''), {corpo.format(r=tabela)}, {data} FROM {tabela}")
+        inserir = f"INSERT INTO busca (rowid, tabela, id_registro, titulo, corpo, data) VALUES (NEW.id * 4 + {codigo}, '{tabela}', NEW.id, COALESCE(NEW.{titulo}, ''), {corpo.format(r='NEW')}, NEW.{data});"
+        apagar = f"DELETE FROM busca WHERE rowid = OLD.id * 4 + {codigo};"
+        c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{tabela}_busca_i AFTER INSERT ON {tabela} BEGIN {inserir} END")
+        c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{tabela}_busca_d AFTER DELETE ON {tabela} BEGIN {apagar} END")
+        c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{tabela}_busca_u AFTER UPDATE ON {tabela} BEGIN {apagar} {inserir} END")
+
+def _m010_alteracoes_externas(c):
+    # Geração por tabela, incrementada por quem grava fora do processo do app (importação pela linha de comando):
+    # o cache de leitura de cada processo confere esta tabela para saber o que ficou velho (ver banco.sincronizar_cache)
+    c.execute('CREATE TABLE IF NOT EXISTS alteracoes_externas (tabela TEXT PRIMARY KEY, geracao INTEGER NOT NULL) WITHOUT ROWID')
+
+def _m011_recorrencias_lideranca(c):
+    # Atividades que se repetem ficam guardadas uma vez como regra; as datas são geradas só para o período exibido (recorrencias.py).
+    # Cada exceção cancela (nova_data NULL) ou remarca uma ocorrência, identificada pela regra e pela data original.
+    c.execute("""CREATE TABLE IF NOT EXISTS recorrencias_lideranca (id INTEGER PRIMARY KEY AUTOINCREMENT, organizacao TEXT, atividade TEXT,
+                 horario_inicio TEXT, horario_fim TEXT, frequencia TEXT NOT NULL CHECK (frequencia IN ('semanal', 'mensal')),
+                 intervalo INTEGER NOT NULL DEFAULT 1 CHECK (intervalo >= 1), semana_do_mes INTEGER CHECK (semana_do_mes IN (1, 2, 3, 4, -1)),
+                 data_inicio TEXT NOT NULL, data_fim TEXT)""")
+    c.execute('CREATE INDEX IF NOT EXISTS idx_recorrencias_periodo ON recorrencias_lideranca (data_inicio, data_fim)')
+    c.execute("""CREATE TABLE IF NOT EXISTS excecoes_recorrencia (id_recorrencia INTEGER NOT NULL REFERENCES recorrencias_lideranca (id) ON DELETE CASCADE,
+                 data TEXT NOT NULL, nova_data TEXT, horario_inicio TEXT, horario_fim TEXT, PRIMARY KEY (id_recorrencia, data)) WITHOUT ROWID""")
+    c.execute('CREATE INDEX IF NOT EXISTS idx_excecoes_nova_data ON excecoes_recorrencia (nova_data)')
+
+MIGRACOES = [
+    (1, "esquema inicial", _m001_esquema_inicial),
+    (2, "datas e horários em ISO-8601", _m002_datas_iso),
+    (3, "índices das consultas quentes", _m003_indices),
+    (4, "fila persistente de mensagens do WhatsApp", _m004_fila_mensagens),
+    (5, "feed de alterações de comunicados e tarefas", _m005_log_alteracoes),
+    (6, "métricas de desempenho", _m006_metricas_desempenho),
+    (7, "razão materializado do orçamento", _m007_razao_orcamento),
+    (8, "histórico dos indicadores", _m008_historico_indicadores),
+    (9, "busca textual (FTS5)", _m009_busca_textual),
+    (10, "alterações externas para o cache de leitura", _m010_alteracoes_externas),
+    (11, "atividades recorrentes do planejamento", _m011_recorrencias_lideranca),
+]
+
+def versao_atual(conn):
+    conn.execute('CREATE TABLE IF NOT EXISTS schema_version (versao INTEGER PRIMARY KEY, descricao TEXT, aplicada_em TEXT)')
+    return conn.execute('SELECT COALESCE(MAX(versao), 0) FROM schema_version').fetchone()[0]
+
+def migrar(pool):
+    aplicadas = []
+    with pool.transacao() as c: atual = versao_atual(c)
+    for versao, descricao, passo in MIGRACOES:
+        if versao <= atual: continue
+        with pool.transacao() as c:
+            # Outro processo pode ter aplicado o passo enquanto esperávamos o lock de escrita
+            if versao_atual(c) >= versao: continue
+            passo(c)
+            c.execute('INSERT INTO schema_version (versao, descricao, aplicada_em) VALUES (?, ?, ?)', (versao, descricao, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        aplicadas.append(versao)
+    if aplicadas:
+        with pool.conexao() as conn: conn.execute("PRAGMA optimize")
+    return aplicadas
@@ -0,0 +1,140 @@
+import calendar
+from datetime import date, timedelta
+import pandas as pd
+import banco
+from instrumentacao import medido
+
+# --- ATIVIDADES RECORRENTES DO PLANEJAMENTO ---
+# Uma atividade que se repete (noite de FHE toda terça, conselho no 2º domingo) é uma linha em recorrencias_lideranca;
+# as datas são geradas sob demanda, só para o período pedido (o mês exibido, o ano do PDF), e as exceções
+# (excecoes_recorrencia) cancelam ou remarcam ocorrências isoladas. Armazenamento e leitura crescem com o número de regras,
+# não com o de ocorrências. atividades_periodo() junta as atividades avulsas (planejamento_lideranca) e as ocorrências.
+#
+# Regra: data_inicio é a primeira ocorrência e define o dia da semana / do mês.
+#   semanal: a cada `intervalo` semanas;
+#   mensal: a cada `intervalo` meses, no mesmo dia do mês (meses sem esse dia são pulados)
+#           ou, com semana_do_mes (1..4, -1 = última), no n-ésimo dia da semana de data_inicio (ex.: 2º domingo).
+HORIZONTE_CONFLITOS_DIAS = 365  # ocorrências de uma regra nova conferidas contra o que já está marcado
+TABELAS = ("planejamento_lideranca", "recorrencias_lideranca", "excecoes_recorrencia")
+COLUNAS = ["id", "organizacao", "atividade", "data_planejada", "horario_inicio", "horario_fim", "id_recorrencia", "data_original"]
+
+def _data(valor):
+    return valor if isinstance(valor, date) else date.fromisoformat(str(valor)[:10])
+
+def semana_do_mes(dia):
+    # 1..4 para o n-ésimo dia da semana no mês; -1 quando é o último (a 5ª ocorrência, que nem todo mês tem)
+    n = (dia.day - 1) // 7 + 1
+    return -1 if n == 5 else n
+
+def _dia_no_mes(ano, mes, base, semana):
+    ultimo = calendar.monthrange(ano, mes)[1]
+    if semana is None: return date(ano, mes, base.day) if base.day <= ultimo else None
+    primeiro = 1 + (base.weekday() - date(ano, mes, 1).weekday()) % 7
+    dia = primeiro + 7 * ((ultimo - primeiro) // 7) if semana == -1 else primeiro + 7 * (semana - 1)
+    return date(ano, mes, dia) if dia <= ultimo else None
+
+def ocorrencias(data_inicio, frequencia, intervalo, semana, inicio, fim):
+    # Gerador das datas da regra em [inicio, fim]: pula direto para a primeira ocorrência da janela,
+    # então o custo é o das ocorrências dentro dela, por mais antiga que seja a regra
+    data_inicio, inicio, fim = _data(data_inicio), _data(inicio), _data(fim)
+    inicio = max(inicio, data_inicio)
+    if inicio > fim: return
+    if frequencia == "semanal":
+        passo = 7 * intervalo
+        dia = data_inicio + timedelta(days=-(-(inicio - data_inicio).days // passo) * passo)
+        while dia <= fim:
+            yield dia; dia += timedelta(days=passo)
+        return
+    base = data_inicio.year * 12 + data_inicio.month - 1
+    indice = inicio.year * 12 + inicio.month - 1
+    indice += (base - indice) % intervalo
+    while True:
+        ano, mes = divmod(indice, 12)
+        if date(ano, mes + 1, 1) > fim: return
+        dia = _dia_no_mes(ano, mes + 1, data_inicio, semana)
+        if dia is not None and inicio <= dia <= fim: yield dia
+        indice += intervalo
+
+DIAS_SEMANA = ["segunda", "terça", "quarta", "quinta", "sexta", "sábado", "domingo"]
+
+def descrever(frequencia, intervalo, semana, data_inicio):
+    # "toda terça", "a cada 2 semanas (terça)", "todo mês no dia 5", "todo 2º domingo do mês", "toda última quinta do mês a cada 2 meses"
+    base = _data(data_inicio)
+    dia_semana = DIAS_SEMANA[base.weekday()]
+    masculino = base.weekday() >= 5  # sábado e domingo
+    todo = "todo" if masculino else "toda"
+    if frequencia == "semanal": return f"{todo} {dia_semana}" if intervalo == 1 else f"a cada {intervalo} semanas ({dia_semana})"
+    if semana is None: texto = f"todo mês no dia {base.day}"
+    elif semana == -1: texto = f"{todo} {'último' if masculino else 'última'} {dia_semana} do mês"
+    else: texto = f"{todo} {semana}{'º' if masculino else 'ª'} {dia_semana} do mês"
+    return texto if intervalo == 1 else f"{texto} a cada {intervalo} meses"
+
+# --- LEITURA POR PERÍODO ---
+def _expandir(inicio, fim):
+    pool = banco.obter_pool()
+    avulsas = pool.consultar("SELECT id, organizacao, atividade, data_planejada, horario_inicio, horario_fim FROM planejamento_lideranca "
+                             "WHERE data_planejada BETWEEN ? AND ?", (inicio, fim))
+    regras = pool.consultar("SELECT id, organizacao, atividade, horario_inicio, horario_fim, frequencia, intervalo, semana_do_mes, data_inicio, data_fim "
+                            "FROM recorrencias_lideranca WHERE data_inicio <= ? AND (data_fim IS NULL OR data_fim >= ?)", (fim, inicio))
+    # Exceções de ocorrências da janela e remarcações que caem nela (a regra pode ter terminado antes da nova data)
+    excecoes = pool.consultar("SELECT e.id_recorrencia, e.data, e.nova_data, e.horario_inicio, e.horario_fim, r.organizacao, r.atividade, r.horario_inicio, r.horario_fim "
+                              "FROM excecoes_recorrencia e JOIN recorrencias_lideranca r ON r.id = e.id_recorrencia "
+                              "WHERE e.data BETWEEN ? AND ? OR e.nova_data BETWEEN ? AND ?", (inicio, fim, inicio, fim))
+    alteradas = {(id_rec, data) for id_rec, data, *_ in excecoes}
+    linhas = [(*a, None, None) for a in avulsas]
+    for id_rec, org, atv, h_ini, h_fim, frequencia, intervalo, semana, data_inicio, data_fim in regras:
+        for dia in ocorrencias(data_inicio, frequencia, intervalo, semana, inicio, min(fim, data_fim or fim)):
+            data = dia.isoformat()
+            if (id_rec, data) not in alteradas: linhas.append((None, org, atv, data, h_ini, h_fim, id_rec, data))
+    for id_rec, data, nova_data, e_ini, e_fim, org, atv, h_ini, h_fim in excecoes:
+        if nova_data and inicio <= nova_data <= fim: linhas.append((None, org, atv, nova_data, e_ini or h_ini, e_fim or h_fim, id_rec, data))
+    df = pd.DataFrame(linhas, columns=COLUNAS)
+    return df.sort_values(["data_planejada", "horario_inicio"], na_position="last", kind="stable").reset_index(drop=True)
+
+@medido()
+def atividades_periodo(inicio, fim):
+    # Atividades avulsas e ocorrências das regras entre duas datas (AAAA-MM-DD), no formato de planejamento_lideranca.
+    # Ocorrências têm id None, id_recorrencia e data_original (a data gerada pela regra, que identifica a exceção).
+    inicio, fim = _data(inicio).isoformat(), _data(fim).isoformat()
+    return banco.obter_pool().cache.obter(("atividades_periodo", inicio, fim), TABELAS, lambda: _expandir(inicio, fim)).copy(deep=False)
+
+def periodo_mes(ano, mes):
+    return date(ano, mes, 1), date(ano, mes, calendar.monthrange(ano, mes)[1])
+
+def periodo_ano(ano):
+    return date(ano, 1, 1), date(ano, 12, 31)
+
+def ler_regras():
+    return banco.ler_dados("recorrencias_lideranca", "data_inicio ASC")
+
+# --- ESCRITA ---
+def adicionar_recorrencia(org, atv, data_inicio, h_ini, h_fim, frequencia, intervalo=1, por_semana_do_mes=False, data_fim=None):
+    # Grava mesmo com conflito de horário; devolve as atividades que cruzam com as ocorrências do primeiro ano (ver conflitos.py)
+    import conflitos  # tardio: conflitos importa este módulo
+    data_inicio = _data(data_inicio)
+    data_fim = _data(data_fim) if data_fim else None
+    semana = semana_do_mes(data_inicio) if frequencia == "mensal" and por_semana_do_mes else None
+    horizonte = data_inicio + timedelta(days=HORIZONTE_CONFLITOS_DIAS)
+    choques = conflitos.sobrepostas_regra(list(ocorrencias(data_inicio, frequencia, intervalo, semana, data_inicio, min(horizonte, data_fim or horizonte))), h_ini, h_fim)
+    banco._gravar('recorrencias_lideranca', 'INSERT INTO recorrencias_lideranca (organizacao, atividade, horario_inicio, horario_fim, frequencia, intervalo, '
+                  'semana_do_mes, data_inicio, data_fim) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                  (org, atv, h_ini, h_fim, frequencia, intervalo, semana, data_inicio.isoformat(), data_fim.isoformat() if data_fim else None))
+    return choques
+
+def cancelar_ocorrencia(id_recorrencia, data):
+    banco._gravar('excecoes_recorrencia', 'INSERT INTO excecoes_recorrencia (id_recorrencia, data) VALUES (?, ?) '
+                  'ON CONFLICT(id_recorrencia, data) DO UPDATE SET nova_data = NULL, horario_inicio = NULL, horario_fim = NULL',
+                  (int(id_recorrencia), _data(data).isoformat()))
+
+def remarcar_ocorrencia(id_recorrencia, data, nova_data, h_ini=None, h_fim=None):
+    # Horários vazios mantêm os da regra
+    banco._gravar('excecoes_recorrencia', 'INSERT INTO excecoes_recorrencia (id_recorrencia, data, nova_data, horario_inicio, horario_fim) VALUES (?, ?, ?, ?, ?) '
+                  'ON CONFLICT(id_recorrencia, data) DO UPDATE SET nova_data = excluded.nova_data, horario_inicio = excluded.horario_inicio, horario_fim = excluded.horario_fim',
+                  (int(id_recorrencia), _data(data).isoformat(), _data(nova_data).isoformat(), h_ini, h_fim))
+
+def restaurar_ocorrencia(id_recorrencia, data):
+    banco._gravar('excecoes_recorrencia', 'DELETE FROM excecoes_recorrencia WHERE id_recorrencia = ? AND data = ?', (int(id_recorrencia), _data(data).isoformat()))
+
+def encerrar_recorrencia(id_recorrencia, data_fim):
+    # Mantém as ocorrências passadas; a exclusão (banco.excluir_registro) apaga a regra e suas exceções
+    banco._gravar('recorrencias_lideranca', 'UPDATE recorrencias_lideranca SET data_fim = ? WHERE id = ?', (_data(data_fim).isoformat(), int(id_recorrencia)))
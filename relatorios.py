@@ -0,0 +1,178 @@
+from io import BytesIO
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import xlsxwriter
+from fpdf import FPDF
+import banco
+import recorrencias
+import conflitos
+from instrumentacao import medido
+
+# --- MOTOR DE RELATÓRIOS (PDF E EXCEL) ---
+# Os relatórios são gerados só quando alguém pede o download e os bytes ficam em cache
+# até que uma das tabelas de origem seja alterada (mesmos contadores de versão do banco.py).
+
+def _texto_pdf(serie):
+    # O FPDF padrão só aceita latin-1: converte a coluna inteira de uma vez (acentos preservados, emojis viram '?')
+    return serie.astype(str).str.encode('latin-1', 'replace').str.decode('latin-1')
+
+
+class RelatorioPDF(FPDF):
+    """FPDF com títulos, rodapé paginado e tabelas que repetem o cabeçalho a cada página."""
+
+    def __init__(self, titulo, subtitulo=None, orientacao='P'):
+        super().__init__(orientation=orientacao)
+        self.set_auto_page_break(True, margin=15)
+        self._tabela_ativa = None
+        self.add_page()
+        self.set_font("Arial", "B", 16)
+        self.cell(0, 10, _texto_pdf(pd.Series([titulo]))[0], 0, 1, "C")
+        if subtitulo:
+            self.set_font("Arial", "I", 10)
+            self.cell(0, 5, _texto_pdf(pd.Series([subtitulo]))[0], 0, 1, "C")
+        self.ln(5)
+
+    def header(self):
+        if self._tabela_ativa: self._desenhar_cabecalho()
+
+    def footer(self):
+        self.set_y(-12)
+        self.set_font("Arial", "I", 8)
+        self.cell(0, 8, f"Pagina {self.page_no()}", 0, 0, "C")
+
+    def secao(self, texto):
+        self.set_font("Arial", "B", 12)
+        self.cell(0, 10, _texto_pdf(pd.Series([texto]))[0], 0, 1)
+
+    def _desenhar_cabecalho(self):
+        cabecalhos, larguras, altura, fonte, cor = self._tabela_ativa
+        self.set_font("Arial", "B", fonte)
+        self.set_fill_color(*cor)
+        for texto, w in zip(cabecalhos, larguras): self.cell(w, altura, texto, 1, 0, 'C', 1)
+        self.ln()
+        self.set_font("Arial", "", fonte)
+
+    def _larguras_automaticas(self, cabecalhos, colunas_texto, fonte):
+        # Largura natural = maior entre o cabeçalho e o texto típico (percentil 90) da coluna, ajustada à página
+        self.set_font("Arial", "", fonte)
+        naturais = []
+        for cab, serie in zip(cabecalhos, colunas_texto):
+            tipico = ""
+            if len(serie):
+                ordem = np.argsort(serie.str.len().to_numpy(), kind='stable')
+                tipico = serie.iloc[ordem[int((len(serie) - 1) * 0.9)]]
+            naturais.append(max(self.get_string_width(cab) + 6, self.get_string_width(tipico) + 4))
+        util = self.w - self.l_margin - self.r_margin
+        fator = util / sum(naturais)
+        return [w * fator for w in naturais]
+
+    def tabela(self, df, colunas, cabecalhos=None, larguras=None, alinhamentos=None, formatos=None, altura=8, fonte=10, cor=(200, 220, 255)):
+        cabecalhos = list(_texto_pdf(pd.Series(cabecalhos or colunas, dtype=object)))
+        formatos = formatos or {}
+        alinhamentos = alinhamentos or ['L'] * len(colunas)
+        colunas_texto = [_texto_pdf(df[c].map(formatos[c]) if c in formatos else df[c].fillna('')) for c in colunas]
+        larguras = larguras or self._larguras_automaticas(cabecalhos, colunas_texto, fonte)
+        # Corta cada coluna de uma vez pelo número de caracteres que cabe na largura
+        self.set_font("Arial", "", fonte)
+        largura_char = self.get_string_width("n")
+        colunas_texto = [s.str.slice(0, max(1, int((w - 2) / largura_char))) for s, w in zip(colunas_texto, larguras)]
+
+        self._tabela_ativa = (cabecalhos, larguras, altura, fonte, cor)
+        self._desenhar_cabecalho()
+        for linha in zip(*colunas_texto):
+            if self.y + altura > self.page_break_trigger: self.add_page()  # o header() repete o cabeçalho
+            for texto, w, alinh in zip(linha, larguras, alinhamentos): self.cell(w, altura, texto, 1, 0, alinh)
+            self.ln()
+        self._tabela_ativa = None
+
+    def bytes(self):
+        return self.output(dest='S').encode('latin-1')
+
+
+# --- EXCEL (xlsxwriter em modo de memória constante: grava linha a linha) ---
+def gerar_excel(abas):
+    output = BytesIO()
+    wb = xlsxwriter.Workbook(output, {'constant_memory': True, 'default_date_format': 'dd/mm/yyyy'})
+    negrito = wb.add_format({'bold': True})
+    for nome, df in abas.items():
+        ws = wb.add_worksheet(str(nome)[:31])
+        ws.write_row(0, 0, [str(c) for c in df.columns], negrito)
+        for i, c in enumerate(df.columns):
+            tamanho = df[c].astype(str).str.len().max() if len(df) else 0
+            ws.set_column(i, i, min(max(len(str(c)), int(tamanho or 0)) + 2, 60))
+        valores = df.astype(object).where(df.notna(), None)
+        for r, linha in enumerate(valores.itertuples(index=False, name=None), start=1): ws.write_row(r, 0, linha)
+    wb.close()
+    return output.getvalue()
+
+def to_excel(df):
+    return gerar_excel({"Sheet1": df})
+
+# --- PDFs ---
+def to_pdf(df, titulo="Relatório"):
+    pdf = RelatorioPDF(titulo)
+    pdf.tabela(df, list(df.columns), cabecalhos=[str(c) for c in df.columns], alinhamentos=['C'] * len(df.columns), altura=10)
+    return pdf.bytes()
+
+def gerar_pdf_calendario(df, df_conflitos=None):
+    pdf = RelatorioPDF("Calendario de Atividades da Ala")
+    pdf.tabela(df, ['data_planejada', 'horario_inicio', 'organizacao', 'atividade'], cabecalhos=["Data", "Hora", "Organizacao", "Atividade"],
+               larguras=[30, 20, 50, 90], alinhamentos=['L'] * 4, altura=10)
+    if df_conflitos is not None and not df_conflitos.empty:
+        pdf.ln(10)
+        pdf.secao(f"Conflitos de Horario ({len(df_conflitos)})")
+        pdf.tabela(df_conflitos, ['data', 'horario_a', 'organizacao_a', 'atividade_a', 'horario_b', 'organizacao_b', 'atividade_b'],
+                   cabecalhos=["Data", "Horario", "Organizacao", "Atividade", "Horario", "Organizacao", "Atividade"],
+                   larguras=[22, 22, 28, 23, 22, 28, 45], fonte=8, cor=(255, 220, 220))
+    return pdf.bytes()
+
+def gerar_pdf_orcamento_completo(df_resumo, df_extrato):
+    pdf = RelatorioPDF("Relatorio Orcamentario", f"Gerado em: {datetime.now().strftime('%d/%m/%Y')}")
+    moeda = lambda v: f"R$ {v:.2f}"
+
+    # 1. Tabela de Resumo (Saldos)
+    pdf.secao("1. Resumo por Organizacao")
+    pdf.tabela(df_resumo, ['Categoria', 'Orçamento', 'Gasto', 'Saldo'], cabecalhos=["Categoria", "Orcamento", "Gasto", "Saldo"],
+               larguras=[60, 40, 40, 40], alinhamentos=['L', 'R', 'R', 'R'], formatos={'Orçamento': moeda, 'Gasto': moeda, 'Saldo': moeda}, altura=10)
+    pdf.ln(10)
+
+    # 2. Tabela de Extrato (Despesas)
+    pdf.secao("2. Historico de Despesas")
+    if not df_extrato.empty:
+        pdf.tabela(df_extrato, ['data_despesa', 'categoria', 'descricao', 'valor'], cabecalhos=["Data", "Categoria", "Descricao", "Valor"],
+                   larguras=[25, 40, 85, 30], alinhamentos=['L', 'L', 'L', 'R'], formatos={'valor': moeda}, fonte=9, cor=(240, 240, 240))
+    else:
+        pdf.set_font("Arial", "I", 10)
+        pdf.cell(0, 10, "Nenhuma despesa registrada no periodo.", 0, 1)
+    return pdf.bytes()
+
+# --- RELATÓRIOS SOB DEMANDA (passados como chamáveis para st.download_button(data=...)) ---
+def _em_cache(chave, tabelas, gerar):
+    return banco.obter_pool().cache.obter(("relatorio",) + chave, tabelas, gerar)
+
+def dados_caravana(mes):
+    df = banco.ler_caravana_mes(mes)[['id', 'nome_irmao', 'valor_total', 'valor_pago', 'quitado']].reset_index(drop=True)
+    df['quitado'] = df['quitado'] == 1
+    df['valor_a_pagar'] = df['valor_total'] - df['valor_pago']
+    return df
+
+@medido()
+def caravana_excel(mes):
+    return _em_cache(("caravana_xlsx", mes), ("financeiro_caravanas",), lambda: to_excel(dados_caravana(mes)))
+
+@medido()
+def caravana_pdf(mes):
+    return _em_cache(("caravana_pdf", mes), ("financeiro_caravanas",), lambda: to_pdf(dados_caravana(mes), mes))
+
+@medido()
+def calendario_pdf(ano):
+    # Atividades avulsas e recorrentes do ano (as recorrências são expandidas só para o período do relatório) e os conflitos de horário
+    return _em_cache(("calendario_pdf", ano), recorrencias.TABELAS,
+                     lambda: gerar_pdf_calendario(recorrencias.atividades_periodo(*recorrencias.periodo_ano(ano)), conflitos.conflitos_ano(ano)))
+
+@medido()
+def orcamento_pdf():
+    # A data de geração sai impressa no relatório, então entra na chave
+    return _em_cache(("orcamento_pdf", datetime.now().strftime('%Y-%m-%d')), ("orcamentos_iniciais", "despesas"),
+                     lambda: gerar_pdf_orcamento_completo(banco.get_resumo_orcamento()[0], banco.ler_dados("despesas")))
@@ -0,0 +1,20 @@
+import os
+import sys
+import pytest
+
+# Os módulos do app ficam na raiz do repositório (sem pacote)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import banco
+import instrumentacao
+
+@pytest.fixture
+def pool(tmp_path):
+    # Banco novo e migrado por teste, ligado como pool do processo
+    anterior = banco._pool
+    instrumentacao.AVULSAS = False
+    pool = banco.configurar(str(tmp_path / "igreja.db"), tamanho=2)
+    banco.init_db()
+    yield pool
+    pool.fechar()
+    banco.definir_pool(anterior)
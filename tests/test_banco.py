@@ -0,0 +1,27 @@
+import pytest
+import banco
+
+# --- PAGINAÇÃO POR CHAVE ---
+def _todas_as_paginas(tabela, coluna, desc, limite):
+    ids, cursor = [], None
+    while True:
+        df, cursor = banco.ler_pagina(tabela, coluna, desc, cursor, limite)
+        ids += df['id'].tolist()
+        if cursor is None: return ids
+
+@pytest.mark.parametrize("desc", [False, True])
+def test_ler_pagina_atravessa_valores_nulos(pool, desc):
+    # 45 compromissos, 38 sem data; páginas de 5 (vários cursores caem em linhas NULL)
+    linhas = [(f"2026-0{1 + i % 7}-10" if i % 6 == 0 else None, "19:00", f"Compromisso {i}", "Pendente") for i in range(45)]
+    pool.executar_muitos("INSERT INTO agenda_bispado (data_agenda, horario, nome_compromisso, status) VALUES (?, ?, ?, ?)", linhas)
+    ids = _todas_as_paginas("agenda_bispado", "data_agenda", desc, 5)
+
+    todas = pool.consultar("SELECT id, data_agenda FROM agenda_bispado")
+    com_data = sorted((r for r in todas if r[1] is not None), key=lambda r: (r[1], r[0]), reverse=desc)
+    sem_data = sorted((r for r in todas if r[1] is None), key=lambda r: r[0], reverse=desc)
+    assert len(ids) == 45
+    assert ids == [r[0] for r in com_data + sem_data]  # datadas na ordem pedida, sem data por último
+
+def test_ler_pagina_por_id(pool):
+    pool.executar_muitos("INSERT INTO comunicados (titulo, mensagem) VALUES (?, ?)", [(f"Aviso {i}", "x") for i in range(23)])
+    assert _todas_as_paginas("comunicados", "id", True, 10) == list(range(23, 0, -1))
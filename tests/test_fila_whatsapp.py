@@ -0,0 +1,67 @@
+import pytest
+import fila_whatsapp
+from fila_whatsapp import EsperaAdaptativa, SondaFalsa
+
+# --- ESPERA ADAPTATIVA ---
+def test_limite_volta_a_subir_depois_de_cargas_rapidas():
+    espera = EsperaAdaptativa(inicial=1.0, minimo=0.05, maximo=2.0, margem=1.5, intervalo=0.001)
+    for _ in range(10): espera.aguardar(SondaFalsa(0.0))
+    assert espera.limite() == pytest.approx(0.05)
+
+    lenta = SondaFalsa(0.15)
+    limites, tempos = [], []
+    for _ in range(5):
+        limites.append(espera.limite())
+        try: tempos.append(espera.aguardar(lenta)); break
+        except TimeoutError: pass
+    assert limites == sorted(limites) and limites[-1] > limites[0]
+    assert tempos and tempos[0] >= 0.15  # recuperou: a página lenta volta a ser esperada até ficar pronta
+
+def test_limite_nao_passa_do_maximo():
+    espera = EsperaAdaptativa(inicial=0.01, minimo=0.01, maximo=0.03, margem=3.0, intervalo=0.001)
+    for _ in range(4):
+        with pytest.raises(TimeoutError): espera.aguardar(SondaFalsa(10.0))
+    assert espera.limite() == pytest.approx(0.03)
+
+# --- FILA DE SAÍDA ---
+def _transporte(falhar_vezes=0):
+    return fila_whatsapp.TransporteStub(falhar_vezes=falhar_vezes, espera=EsperaAdaptativa(inicial=1.0, minimo=0.01, intervalo=0.001))
+
+def test_chave_repetida_envia_uma_vez_e_agrupa_por_destino(pool):
+    assert fila_whatsapp.enfileirar("aniv:1", "contato", "5511999990001", "Parabéns!", "Ana")
+    assert not fila_whatsapp.enfileirar("aniv:1", "contato", "5511999990001", "Parabéns!", "Ana")
+    assert fila_whatsapp.enfileirar("lembrete:1", "contato", "5511999990001", "Reunião às 19h", "Ana")
+    assert fila_whatsapp.enfileirar("aviso:1", "grupo", "Ala Centro", "Conferência domingo")
+
+    transporte = _transporte()
+    assert fila_whatsapp.drenar(transporte) == (3, 0)
+    assert [m["chave"] for m in transporte.enviadas] == ["aniv:1", "lembrete:1", "aviso:1"]
+    assert transporte.conversas_abertas == 2  # uma conversa por destino
+    assert fila_whatsapp.resumo_fila() == {"enviado": 3}
+    assert fila_whatsapp.drenar(_transporte()) == (0, 0)
+
+def test_falha_volta_para_a_fila_com_espera(pool):
+    fila_whatsapp.enfileirar("aviso:2", "grupo", "Ala Centro", "Conferência domingo")
+    assert fila_whatsapp.drenar(_transporte(falhar_vezes=1)) == (0, 1)
+    tentativas, proxima, erro = pool.consultar("SELECT tentativas, proxima_tentativa, ultimo_erro FROM fila_mensagens")[0]
+    assert (tentativas, erro) == (1, "falha simulada") and proxima > fila_whatsapp._agora()
+    assert fila_whatsapp.drenar(_transporte()) == (0, 0)  # ainda dentro do backoff
+
+    pool.executar("UPDATE fila_mensagens SET proxima_tentativa = ?", (fila_whatsapp._agora(),))
+    assert fila_whatsapp.drenar(_transporte()) == (1, 0)
+    assert fila_whatsapp.resumo_fila() == {"enviado": 1}
+
+def test_desiste_depois_do_maximo_de_tentativas(pool):
+    fila_whatsapp.enfileirar("aviso:3", "grupo", "Ala Centro", "Conferência domingo")
+    for _ in range(fila_whatsapp.MAX_TENTATIVAS):
+        pool.executar("UPDATE fila_mensagens SET proxima_tentativa = ?", (fila_whatsapp._agora(),))
+        assert fila_whatsapp.drenar(_transporte(falhar_vezes=1)) == (0, 1)
+    assert fila_whatsapp.resumo_fila() == {"falhou": 1}
+
+def test_mensagem_interrompida_volta_para_a_fila(pool):
+    fila_whatsapp.enfileirar("aviso:4", "grupo", "Ala Centro", "Conferência domingo")
+    assert len(fila_whatsapp._reservar_lote()) == 1  # processo "caiu" durante o envio
+    assert fila_whatsapp.resumo_fila() == {"enviando": 1}
+    assert fila_whatsapp.drenar(_transporte()) == (0, 0)
+    assert fila_whatsapp.recuperar_interrompidas() == 1
+    assert fila_whatsapp.drenar(_transporte()) == (1, 0)
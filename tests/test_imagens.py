@@ -0,0 +1,24 @@
+import io
+import os
+import pytest
+import imagens
+
+PIL = pytest.importorskip("PIL.Image")
+
+def _jpeg():
+    saida = io.BytesIO()
+    PIL.new("RGB", (1600, 900), (30, 60, 120)).save(saida, "JPEG")
+    return saida.getvalue()
+
+# --- CACHE DE VARIANTES POR ALA ---
+def test_remover_imagem_nao_apaga_variantes_de_outra_ala(tmp_path):
+    dados = _jpeg()
+    centro = imagens.salvar_upload(dados, "coro.jpg", str(tmp_path / "alas" / "centro" / "posts"))
+    norte = imagens.salvar_upload(dados, "coro.jpg", str(tmp_path / "alas" / "norte" / "posts"))
+    miniatura_norte = imagens.variante(norte, "miniatura")
+    assert imagens.pasta_cache(centro) != imagens.pasta_cache(norte)
+
+    imagens.remover_imagem(centro)
+    assert not os.path.exists(centro) and not os.listdir(imagens.pasta_cache(centro))
+    assert os.path.exists(norte) and os.path.exists(miniatura_norte)
+    assert imagens.variante(norte, "miniatura") == miniatura_norte
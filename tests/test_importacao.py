@@ -0,0 +1,40 @@
+import importacao
+
+def _csv(tmp_path, descricoes, categoria):
+    caminho = tmp_path / "despesas.csv"
+    linhas = ["Data;Organização;Descrição;Valor;Responsável"]
+    linhas += [f"2026-03-{1 + i % 28:02d};{categoria};{d};{10 + i},50;Tesoureiro" for i, d in enumerate(descricoes)]
+    caminho.write_text("\n".join(linhas), encoding="utf-8")
+    return str(caminho)
+
+def _categoria(pool):
+    return pool.consultar("SELECT categoria FROM orcamentos_iniciais ORDER BY id LIMIT 1")[0][0]
+
+def _total(pool):
+    return pool.consultar("SELECT COUNT(*) FROM despesas")[0][0]
+
+# --- GRAVAÇÃO EM BLOCOS ---
+def test_importa_em_blocos_e_reimportar_nao_duplica(pool, tmp_path):
+    arquivo = _csv(tmp_path, [f"Item {i}" for i in range(1200)], _categoria(pool))
+    rel = importacao.importar(arquivo, "despesas", tamanho_bloco=500)
+    assert (rel.lidas, rel.gravadas, rel.erros) == (1200, 1200, [])
+    assert _total(pool) == 1200
+    de_novo = importacao.importar(arquivo, "despesas", tamanho_bloco=500)
+    assert (de_novo.existentes, de_novo.gravadas) == (1200, 0)
+
+def test_linha_invalida_nao_grava_nada_sem_ignorar(pool, tmp_path):
+    descricoes = [f"Item {i}" for i in range(700)] + [""]  # última linha (2º bloco) sem descrição
+    arquivo = _csv(tmp_path, descricoes, _categoria(pool))
+    rel = importacao.importar(arquivo, "despesas", tamanho_bloco=500)
+    assert rel.gravadas == 0 and len(rel.erros) == 1 and _total(pool) == 0
+    rel = importacao.importar(arquivo, "despesas", ignorar_invalidas=True, tamanho_bloco=500)
+    assert rel.gravadas == 700 and _total(pool) == 700
+
+def test_bloco_recusado_pelo_banco_nao_desfaz_os_outros(pool, tmp_path):
+    pool.executar("CREATE TRIGGER recusa_ruim BEFORE INSERT ON despesas WHEN NEW.descricao = 'ruim' BEGIN SELECT RAISE(ABORT, 'recusada'); END")
+    descricoes = [f"Item {i}" for i in range(250)]
+    descricoes[120] = "ruim"  # 2º bloco de 100
+    arquivo = _csv(tmp_path, descricoes, _categoria(pool))
+    rel = importacao.importar(arquivo, "despesas", tamanho_bloco=100)
+    assert rel.gravadas == 150 and _total(pool) == 150
+    assert len(rel.erros) == 100 and all("não gravada" in msg for _, msg in rel.erros)